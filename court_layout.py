@@ -0,0 +1,236 @@
+import heapq
+
+LEVELS = ["beginner", "intermediate", "advanced"]
+# Doubles: four players share a court
+PLAYERS_PER_COURT = 4
+
+COURTS = "courts"
+SETTINGS = "layout_settings"
+# Optional: the id the next new court gets, kept so ids of removed courts are never reused
+NEXT_ID = "next_court_id"
+
+
+def court_position(court):
+    pos = court.get("position", {})
+    return pos.get("row", 0), pos.get("col", 0)
+
+
+def allocate_court_levels(skill_counts, court_count):
+    """Split `court_count` courts between the levels for {level: players signed up}.
+
+    Each court goes to the level with the most players still without a
+    court, so a level only gets a second court once the others' players are
+    placed too. Courts left once everyone has one are shared in proportion
+    to the players (highest averages). Levels nobody signed up for get no
+    courts, unless nobody signed up at all; then the courts are split evenly.
+    Returns {level: courts} for every level.
+    """
+    players = [skill_counts.get(level, 0) for level in LEVELS] if any(skill_counts.values()) else [1] * len(LEVELS)
+    courts = [0] * len(LEVELS)
+    # Max-heap on (players without a court, players per court with one more), earlier levels first on ties
+    heap = [(-n, -n, i) for i, n in enumerate(players) if n]
+    heapq.heapify(heap)
+    for _ in range(court_count if heap else 0):
+        _, _, i = heapq.heappop(heap)
+        courts[i] += 1
+        waiting = max(players[i] - PLAYERS_PER_COURT * courts[i], 0)
+        heapq.heappush(heap, (-waiting, -players[i] / (courts[i] + 1), i))
+    return dict(zip(LEVELS, courts))
+
+
+class CourtLayout:
+    """The courts of court_layout.json with O(1) lookup by id, grid position and name.
+
+    Courts are kept in file order in a dict keyed by id. The position and
+    name indexes cover active courts only; when the file places two active
+    courts on one position, or gives two the same name, the later one wins,
+    as it does in the rendered image. New ids come from a counter that only
+    moves forward.
+    """
+
+    def __init__(self, courts=(), settings=None, next_id=1):
+        self.settings = settings if settings is not None else {}
+        self._courts = {}
+        self._by_position = {}
+        self._by_name = {}
+        self._extra = {}
+        courts = list(courts)
+        ids = [c.get("id") for c in courts if isinstance(c.get("id"), int)]
+        self._next_id = max([next_id] + [court_id + 1 for court_id in ids])
+        for court in courts:
+            court_id = court.get("id")
+            if not isinstance(court_id, int) or court_id in self._courts:
+                # Missing or repeated ids get a fresh one; the caller's dict is not modified
+                court = dict(court, id=None)
+            self._insert(court)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a layout from the court_layout.json shape"""
+        layout = cls(data.get(COURTS, []), data.get(SETTINGS), data.get(NEXT_ID, 1))
+        layout._extra = {k: v for k, v in data.items() if k not in (COURTS, SETTINGS, NEXT_ID)}
+        return layout
+
+    def to_dict(self):
+        """Serialize to the court_layout.json shape.
+
+        The id counter is only written when it is ahead of the highest id, so
+        a file that never lost its newest court saves back unchanged.
+        """
+        data = dict(self._extra)
+        data[COURTS] = list(self._courts.values())
+        data[SETTINGS] = self.settings
+        if self._next_id > max(self._courts, default=0) + 1:
+            data[NEXT_ID] = self._next_id
+        return data
+
+    # Lookup
+    def __len__(self):
+        return len(self._courts)
+
+    def __iter__(self):
+        return iter(self._courts.values())
+
+    def __contains__(self, court_id):
+        return court_id in self._courts
+
+    def get(self, court_id):
+        """Return the court with `court_id`, or None"""
+        return self._courts.get(court_id)
+
+    def at(self, row, col):
+        """Return the active court at (row, col), or None"""
+        court_id = self._by_position.get((row, col))
+        return None if court_id is None else self._courts[court_id]
+
+    def find(self, name):
+        """Return the active court called `name`, or None"""
+        court_id = self._by_name.get(name)
+        return None if court_id is None else self._courts[court_id]
+
+    @property
+    def courts(self):
+        return list(self._courts.values())
+
+    @property
+    def active_courts(self):
+        return [c for c in self._courts.values() if c.get("active", True)]
+
+    def placed(self, rows, cols):
+        """{(row, col): court} for the active courts inside a rows x cols grid"""
+        return {pos: self._courts[court_id] for pos, court_id in self._by_position.items()
+                if pos[0] < rows and pos[1] < cols}
+
+    def empty_positions(self, rows, cols):
+        """Grid positions without an active court, row by row"""
+        return [(row, col) for row in range(rows) for col in range(cols) if (row, col) not in self._by_position]
+
+    # Mutation
+    def allocate_id(self):
+        court_id = self._next_id
+        self._next_id += 1
+        return court_id
+
+    def apply(self, edits):
+        """Apply {(row, col): (name, level) or None} to the grid as one all-or-nothing change.
+
+        A name and level place a court at the position - the court already
+        there keeps its id and other fields - and None empties it. Names may
+        move between edited positions. Everything is checked first; on any
+        problem a ValueError listing all of them is raised and nothing
+        changes. Returns {"added": n, "updated": n, "removed": n}.
+        """
+        errors, cleaned = [], {}
+        # Names held by courts that are not being edited
+        taken = {}
+        for name, court_id in self._by_name.items():
+            position = court_position(self._courts[court_id])
+            if position not in edits:
+                taken[name] = position
+        for (row, col), edit in sorted(edits.items()):
+            where = f"({row + 1}, {col + 1})"
+            if edit is None:
+                cleaned[(row, col)] = None
+                continue
+            name, level = " ".join(edit[0].split()), edit[1]
+            if not name:
+                errors.append(f"The court at {where} needs a name")
+            if level not in LEVELS:
+                errors.append(f"Unknown skill level '{level}' at {where}")
+            if name in taken:
+                other_row, other_col = taken[name]
+                errors.append(f"Court name '{name}' is used at both ({other_row + 1}, {other_col + 1}) and {where}")
+            taken[name] = (row, col)
+            cleaned[(row, col)] = (name, level)
+        if errors:
+            raise ValueError("\n".join(errors))
+
+        changes = {"added": 0, "updated": 0, "removed": 0}
+        current = {position: self.at(*position) for position in cleaned}
+        # Drop the edited courts from the indexes first so names can move between them
+        for court in current.values():
+            if court is not None:
+                self._unindex(court)
+        for (row, col), edit in cleaned.items():
+            court = current[(row, col)]
+            if edit is None:
+                if court is not None:
+                    del self._courts[court["id"]]
+                    changes["removed"] += 1
+            elif court is None:
+                self._insert({"id": None, "name": edit[0], "level": edit[1],
+                              "position": {"row": row, "col": col}, "active": True})
+                changes["added"] += 1
+            else:
+                if (court.get("name"), court.get("level")) != edit:
+                    court = self._courts[court["id"]] = dict(court, name=edit[0], level=edit[1])
+                    changes["updated"] += 1
+                self._index(court)
+        return changes
+
+    def place(self, row, col, name, level):
+        """Put a court called `name` at (row, col), updating the one already there.
+
+        Returns "added", "updated" or None when nothing changed, and raises
+        ValueError as apply() does.
+        """
+        changes = self.apply({(row, col): (name, level)})
+        return next((change for change, n in changes.items() if n), None)
+
+    def remove(self, court_id):
+        """Remove the court with `court_id` and return it. Raises KeyError if there is none."""
+        return self._remove(court_id)
+
+    def remove_at(self, row, col):
+        """Remove the active court at (row, col) and return it, or None if the position is empty"""
+        court = self.at(row, col)
+        return None if court is None else self._remove(court["id"])
+
+    def clear(self):
+        """Remove every court; ids keep counting from where they were"""
+        self._courts.clear()
+        self._by_position.clear()
+        self._by_name.clear()
+
+    def _insert(self, court):
+        if court.get("id") is None:
+            court["id"] = self.allocate_id()
+        self._courts[court["id"]] = court
+        self._index(court)
+
+    def _remove(self, court_id):
+        court = self._courts.pop(court_id)
+        self._unindex(court)
+        return court
+
+    def _index(self, court):
+        if court.get("active", True):
+            self._by_position[court_position(court)] = court["id"]
+            self._by_name[court.get("name", "")] = court["id"]
+
+    def _unindex(self, court):
+        position, name = court_position(court), court.get("name", "")
+        if self._by_position.get(position) == court["id"]:
+            del self._by_position[position]
+        if self._by_name.get(name) == court["id"]:
+            del self._by_name[name]
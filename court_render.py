@@ -0,0 +1,831 @@
+import hashlib
+import html
+import io
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from court_layout import LEVELS, CourtLayout
+
+
+# Font Registry
+# Candidate files per family, tried in order. Windows ships arial, most
+# Linux distributions DejaVu.
+FONT_FAMILIES = {
+    "sans": ["arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf", "Helvetica.ttc"],
+}
+
+# (family, size) -> (font or None, name of the font actually used)
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+
+def _load_font(family, size):
+    for candidate in FONT_FAMILIES.get(family, []):
+        try:
+            return ImageFont.truetype(candidate, size), candidate
+        except OSError:
+            continue
+    # Pillow's bundled font; scalable when Pillow was built with FreeType
+    try:
+        return ImageFont.load_default(size=size), "default"
+    except (TypeError, ImportError, OSError):
+        return None, None
+
+
+def get_font(size, family="sans"):
+    """Return the font for (family, size), loading it from disk only the first time.
+
+    Returns None if no font could be loaded; callers then draw with PIL's
+    built-in bitmap font.
+    """
+    key = (family, size)
+    with _fonts_lock:
+        if key not in _fonts:
+            _fonts[key] = _load_font(family, size)
+        return _fonts[key][0]
+
+
+def font_source(size, family="sans"):
+    """Name of the font file picked for (family, size), "default" or None"""
+    get_font(size, family)
+    return _fonts[(family, size)][1]
+
+
+# Court Image Generation
+COLORS = {
+    'beginner': '#28a745', 'intermediate': '#fd7e14', 'advanced': '#dc3545',
+    'background': '#f8f9fa', 'border': '#343a40', 'text': '#ffffff'
+}
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry past `maxsize`"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.stats["misses"] += 1
+            else:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+
+def hit_rate(stats):
+    """Fraction of lookups served from the cache, 0.0 before the first lookup"""
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else 0.0
+
+
+# Text Metrics
+# Court names, levels and the legend repeat across courts and renders, so
+# each (text, family, size) is measured once and its box reused for all
+# centering.
+TEXT_METRICS_CACHE_SIZE = 4096
+
+_text_metrics = LRUCache(TEXT_METRICS_CACHE_SIZE)
+TEXT_METRICS_STATS = _text_metrics.stats
+
+
+def text_bbox(text, size, family="sans"):
+    """Bounding box of `text` drawn at the origin in the (family, size) font"""
+    key = (text, family, size)
+    bbox = _text_metrics.get(key)
+    if bbox is None:
+        bbox = get_font(size, family).getbbox(text)
+        _text_metrics.put(key, bbox)
+    return bbox
+
+
+def text_width(text, size, family="sans"):
+    left, _, right, _ = text_bbox(text, size, family)
+    return right - left
+
+
+# Layout Engine
+DEFAULT_WIDTH, DEFAULT_HEIGHT = 1200, 800
+# Canvas sides are clamped to this range so huge venues render at bounded cost
+MIN_CANVAS_SIDE, MAX_CANVAS_SIDE = 200, 4096
+# Full-size court tile; tiles shrink (keeping this aspect) to fit large grids
+COURT_W, COURT_H = 160, 100
+# Smallest tile drawn; grids that do not fit even at this size are cut to the rows and columns that do
+MIN_COURT_W, MIN_COURT_H = 4, 3
+# Narrower tiles get no name or level: their text would be held at the 6 px
+# font floor, unreadable and spilling over the neighbours, and drawing it
+# would dominate the cost of a big grid
+MIN_LABEL_COURT_W = 48
+SPACING = 15
+HEADER_HEIGHT, FOOTER_HEIGHT = 70, 100
+
+
+def compute_layout(settings, scale=1.0):
+    """Canvas size, court grid placement and font sizes for `settings`.
+
+    The canvas honors image_width/image_height (default 1200x800), multiplied
+    by `scale` for reduced-size previews. Courts are drawn at 160x100 when
+    the grid fits and scaled down uniformly when it does not, so every court
+    stays between the title and the legend. A grid too large for even
+    MIN_COURT_W x MIN_COURT_H tiles is cut to the rows and columns that fit;
+    courts beyond them are not drawn, and the statistics line says how many
+    (see hidden_courts).
+    """
+    width = min(max(int(settings.get('image_width', DEFAULT_WIDTH) * scale), MIN_CANVAS_SIDE), MAX_CANVAS_SIDE)
+    height = min(max(int(settings.get('image_height', DEFAULT_HEIGHT) * scale), MIN_CANVAS_SIDE), MAX_CANVAS_SIDE)
+    rows, cols = max(int(settings.get('rows', 3)), 1), max(int(settings.get('cols', 4)), 1)
+
+    # Headers, legend and text never grow past their size on the default canvas
+    ui_scale = min(1.0, width / DEFAULT_WIDTH, height / DEFAULT_HEIGHT)
+    header, footer = round(HEADER_HEIGHT * ui_scale), round(FOOTER_HEIGHT * ui_scale)
+
+    # Largest tile scale that fits the grid into the space between header and
+    # footer, never larger than the rest of the drawing
+    avail_w = width - 2 * round(SPACING * ui_scale)
+    avail_h = height - header - footer - round(SPACING * ui_scale)
+    cols = min(cols, max((avail_w + 1) // (MIN_COURT_W + 1), 1))
+    rows = min(rows, max((avail_h + 1) // (MIN_COURT_H + 1), 1))
+    tile_scale = min(ui_scale,
+                     avail_w / (cols * COURT_W + (cols - 1) * SPACING),
+                     avail_h / (rows * COURT_H + (rows - 1) * SPACING))
+    spacing_x = spacing_y = max(int(SPACING * tile_scale), 1)
+    # The one pixel minimum spacing can take more room than the scaled one, so tiles give it back
+    court_w = max(min(int(COURT_W * tile_scale), (avail_w - (cols - 1) * spacing_x) // cols), MIN_COURT_W)
+    court_h = max(min(int(COURT_H * tile_scale), (avail_h - (rows - 1) * spacing_y) // rows), MIN_COURT_H)
+
+    return {
+        'width': width, 'height': height, 'rows': rows, 'cols': cols,
+        'court_w': court_w, 'court_h': court_h,
+        'spacing_x': spacing_x, 'spacing_y': spacing_y,
+        'margin_x': (width - (cols * court_w + (cols-1) * spacing_x)) // 2,
+        'margin_y': header,
+        'legend_y': height - footer,
+        'ui_scale': ui_scale,
+        'title_size': _font_size(28 * ui_scale),
+        'small_size': _font_size(16 * ui_scale),
+    }
+
+
+def _font_size(size):
+    return max(int(round(size)), 6)
+
+
+def _tile_text_layout(court_w):
+    """Font sizes and vertical offsets of the name and level inside a court tile"""
+    scale = court_w / COURT_W
+    return _font_size(20 * scale), _font_size(16 * scale), round(30 * scale), round(55 * scale)
+
+
+def _cell_origin(geo, row, col):
+    return (geo['margin_x'] + col * (geo['court_w'] + geo['spacing_x']),
+            geo['margin_y'] + row * (geo['court_h'] + geo['spacing_y']))
+
+
+def _draw_centered(draw, text, left, width, y, size, fallback_x, char_w):
+    """Draw `text` horizontally centered in [left, left + width)"""
+    font = get_font(size)
+    try:
+        if font:
+            draw.text((left + (width - text_width(text, size)) // 2, y), text, fill=COLORS['border'], font=font)
+        else:
+            draw.text((left + width//2 - len(text)*char_w, y), text, fill=COLORS['border'])
+    except Exception:
+        draw.text((fallback_x, y), text, fill=COLORS['border'])
+
+
+def _draw_court(draw, x, y, court_w, court_h, name, level):
+    """Draw one court rectangle with its centered name and level; a name of None leaves it blank"""
+    draw.rectangle([x, y, x + court_w, y + court_h], fill=COLORS[level], outline=COLORS['border'], width=2)
+    if name is not None:
+        _draw_court_text(draw, x, y, court_w, name, level)
+
+
+def _has_label(court_w):
+    return court_w >= MIN_LABEL_COURT_W
+
+
+def _draw_court_text(draw, x, y, court_w, name, level):
+    if not _has_label(court_w):
+        return
+    name_size, level_size, name_y, level_y = _tile_text_layout(court_w)
+    font_md, font_sm = get_font(name_size), get_font(level_size)
+    level = level.title()
+    try:
+        if font_md and font_sm:
+            name_x = x + (court_w - text_width(name, name_size)) // 2
+            level_x = x + (court_w - text_width(level, level_size)) // 2
+            draw.text((name_x, y + name_y), name, fill=COLORS['text'], font=font_md)
+            draw.text((level_x, y + level_y), level, fill=COLORS['text'], font=font_sm)
+        else:
+            draw.text((x + court_w//2 - len(name)*4, y + name_y), name, fill=COLORS['text'])
+            draw.text((x + court_w//2 - len(level)*3, y + level_y), level, fill=COLORS['text'])
+    except Exception:
+        draw.text((x + court_w//2 - len(name)*4, y + name_y + 5), name, fill=COLORS['text'])
+        draw.text((x + court_w//2 - len(level)*3, y + level_y), level, fill=COLORS['text'])
+
+
+def _text_fits(name, level, court_w, court_h):
+    """Whether a court's name and level are drawn entirely inside its tile"""
+    if not _has_label(court_w):
+        return True
+    name_size, level_size, name_y, level_y = _tile_text_layout(court_w)
+    if not get_font(name_size) or not get_font(level_size):
+        return False
+    for text, size, y in ((name, name_size, name_y), (level.title(), level_size, level_y)):
+        left, top, right, bottom = text_bbox(text, size)
+        x = (court_w - (right - left)) // 2
+        if x + left < 0 or x + right > court_w + 1 or y + top < 0 or y + bottom > court_h + 1:
+            return False
+    return True
+
+
+def _spilling_courts(placed, geo):
+    """The courts of `placed` whose text does not fit their tile"""
+    return {pos: court for pos, court in placed.items() if not _text_fits(*court, geo['court_w'], geo['court_h'])}
+
+
+def _draw_spilling_text(draw, geo, spilling):
+    """Draw text that spills out of its tile; it goes last, over the legend and statistics line"""
+    for (row, col), (name, level) in spilling.items():
+        x, y = _cell_origin(geo, row, col)
+        _draw_court_text(draw, x, y, geo['court_w'], name, level)
+
+
+def _draw_empty_slot(draw, x, y, court_w, court_h, admin_mode):
+    draw.rectangle([x, y, x + court_w, y + court_h], fill='#e9ecef', outline='#adb5bd', width=1)
+    if admin_mode:
+        # Plus icon for empty slots
+        arm = min(15, court_w // 4, court_h // 4)
+        draw.line([x + court_w//2 - arm, y + court_h//2, x + court_w//2 + arm, y + court_h//2], fill='#6c757d', width=2)
+        draw.line([x + court_w//2, y + court_h//2 - arm, x + court_w//2, y + court_h//2 + arm], fill='#6c757d', width=2)
+
+
+def _legend_boxes(geo):
+    """(x, y, width, height) of each level's legend swatch"""
+    scale = geo['ui_scale']
+    box_w, box_h = round(25 * scale), round(18 * scale)
+    return [(round((80 + i * 160) * scale), geo['legend_y'], box_w, box_h) for i in range(len(LEVELS))]
+
+
+def _draw_legend(draw, geo, boxes=True):
+    font_sm = get_font(geo['small_size'])
+    legend_y, text_dx = geo['legend_y'], round(35 * geo['ui_scale'])
+    for level, (x, _, box_w, box_h) in zip(LEVELS, _legend_boxes(geo)):
+        if boxes:
+            draw.rectangle([x, legend_y, x + box_w, legend_y + box_h], fill=COLORS[level], outline=COLORS['border'], width=1)
+        try:
+            if font_sm:
+                draw.text((x + text_dx, legend_y + 2), level.title(), fill=COLORS['border'], font=font_sm)
+            else:
+                draw.text((x + text_dx, legend_y + 2), level.title(), fill=COLORS['border'])
+        except Exception:
+            draw.text((x + text_dx, legend_y + 2), level.title(), fill=COLORS['border'])
+
+
+def _placed_courts(courts, geo):
+    """{(row, col): (name, level)} for the active courts that fall inside the grid"""
+    placed = CourtLayout(courts).placed(geo['rows'], geo['cols'])
+    return {pos: (court.get('name', f'Court {court["id"]}'), court['level']) for pos, court in placed.items()}
+
+
+def hidden_courts(courts, settings, scale=1.0):
+    """Number of active courts left out of the image at `scale`.
+
+    These lie outside the grid, either beyond the configured rows and
+    columns or cut because the grid does not fit the canvas.
+    """
+    active = [c for c in courts if c.get("active", True)]
+    return len(active) - len(_placed_courts(courts, compute_layout(settings, scale)))
+
+
+def _stats_y(geo):
+    return geo['legend_y'] + round(30 * geo['ui_scale'])
+
+
+def _stats_band(geo, *texts):
+    """(left, top, right, bottom) of the full-width band the statistics line can cover.
+
+    The band spans the measured height of each given text, so it never
+    reaches into the legend above it on small canvases.
+    """
+    y, size = _stats_y(geo), geo['small_size']
+    if get_font(size):
+        boxes = [text_bbox(text, size) for text in texts if text]
+        top, bottom = y + min(box[1] for box in boxes), y + max(box[3] for box in boxes)
+    else:
+        top, bottom = y, y + round(30 * geo['ui_scale'])
+    return 0, max(top, 0), geo['width'], min(bottom, geo['height'])
+
+
+def _stats_text(active_courts, shown):
+    text = f"Total: {len(active_courts)} | " + " | ".join(
+        [f"{level.title()}: {len([c for c in active_courts if c.get('level') == level])}" for level in LEVELS])
+    if shown < len(active_courts):
+        text += f" | {len(active_courts) - shown} not shown"
+    return text
+
+
+class TileRenderer:
+    """Layered court layout renderer that only redraws what changed.
+
+    The image is built from three kinds of layer: a base (background, title,
+    empty slots and legend), one tile per court and a strip holding the
+    statistics line. Each is cached by its own content. The last composite
+    for every base is also kept, so a new render copies it and pastes only
+    the tiles whose court changed - editing one court costs one tile draw
+    plus a paste.
+
+    A name or level too big for its tile spills onto the neighbouring
+    cells, the legend or the statistics line, which a tile cannot hold.
+    Those courts get a tile without text and their text is drawn over a
+    copy of the composite, so the composite itself stays reusable.
+    """
+
+    def __init__(self, tile_cache_size=512, base_cache_size=8):
+        self._tiles = LRUCache(tile_cache_size)
+        self._bases = LRUCache(base_cache_size)
+        self._strips = LRUCache(64)
+        # base key -> ({(row, col): tile key}, stats text, composite image)
+        self._composites = LRUCache(base_cache_size)
+        self._lock = threading.Lock()
+        self.stats = {"tile_draws": 0, "tile_pastes": 0}
+
+    def render(self, courts, settings, scale=1.0):
+        geo = compute_layout(settings, scale)
+        title = settings.get('center_name', 'Team Baddies Badminton Center')
+        admin_mode = bool(settings.get('admin_mode'))
+        base_key = (title, admin_mode, tuple(sorted(geo.items())))
+
+        placed = _placed_courts(courts, geo)
+        spilling = _spilling_courts(placed, geo)
+        # Tiles without text are alike for a level, so they share one cached tile
+        labelled = _has_label(geo['court_w'])
+        tile_keys = {pos: (name if labelled and pos not in spilling else None, level, geo['court_w'], geo['court_h'])
+                     for pos, (name, level) in placed.items()}
+        stats = _stats_text([c for c in courts if c.get("active", True)], len(placed))
+
+        with self._lock:
+            base = self._base(base_key, geo, title, admin_mode)
+            previous = self._composites.get(base_key)
+            if previous is None:
+                img, old_keys, old_stats = base.copy(), {}, None
+            else:
+                old_keys, old_stats, last_img = previous
+                img = last_img.copy()
+
+            for pos in old_keys.keys() | tile_keys.keys():
+                key = tile_keys.get(pos)
+                if key == old_keys.get(pos):
+                    continue
+                x, y = _cell_origin(geo, *pos)
+                box = (x, y, x + geo['court_w'] + 1, y + geo['court_h'] + 1)
+                # A removed court is restored from the base, a new or changed one pasted in
+                img.paste(self._tile(key) if key else base.crop(box), box[:2])
+                self.stats["tile_pastes"] += 1
+
+            if stats != old_stats:
+                # Covers the old line as well as the new one
+                band = _stats_band(geo, stats, old_stats)
+                img.paste(self._strip(base_key, base, stats, band, geo), band[:2])
+
+            self._composites.put(base_key, (tile_keys, stats, img))
+
+        if spilling:
+            img = img.copy()
+            _draw_spilling_text(ImageDraw.Draw(img), geo, spilling)
+        return img
+
+    def _base(self, base_key, geo, title, admin_mode):
+        base = self._bases.get(base_key)
+        if base is None:
+            base = Image.new('RGB', (geo['width'], geo['height']), COLORS['background'])
+            draw = ImageDraw.Draw(base)
+            _draw_centered(draw, title, 0, geo['width'], round(15 * geo['ui_scale']), geo['title_size'], 50, 6)
+            for row in range(geo['rows']):
+                for col in range(geo['cols']):
+                    x, y = _cell_origin(geo, row, col)
+                    _draw_empty_slot(draw, x, y, geo['court_w'], geo['court_h'], admin_mode)
+            _draw_legend(draw, geo)
+            self._bases.put(base_key, base)
+        return base
+
+    def _tile(self, key):
+        tile = self._tiles.get(key)
+        if tile is None:
+            name, level, court_w, court_h = key
+            tile = Image.new('RGB', (court_w + 1, court_h + 1), COLORS[level])
+            _draw_court(ImageDraw.Draw(tile), 0, 0, court_w, court_h, name, level)
+            self._tiles.put(key, tile)
+            self.stats["tile_draws"] += 1
+        return tile
+
+    def _strip(self, base_key, base, stats, band, geo):
+        key = (base_key, stats, band)
+        strip = self._strips.get(key)
+        if strip is None:
+            strip = base.crop(band)
+            _draw_centered(ImageDraw.Draw(strip), stats, 0, geo['width'], _stats_y(geo) - band[1],
+                           geo['small_size'], 50, 4)
+            self._strips.put(key, strip)
+        return strip
+
+
+_tile_renderer = TileRenderer()
+TILE_STATS = _tile_renderer.stats
+
+
+# NumPy Backend
+# The canvas is a 2D array of packed RGBX pixels, so every fill is a plain
+# store of one 32-bit value and PIL reads the array back without unpacking.
+def _pixel(color):
+    return np.array([int(color[i:i + 2], 16) for i in (1, 3, 5)] + [255], dtype=np.uint8).view(np.uint32)[0]
+
+
+# Cell kind -> colours: 0 is an empty slot, 1.. follow LEVELS. Empty slots
+# have a one pixel outline, courts a two pixel one, so the second ring from
+# the edge is fill coloured for a slot and outline coloured for a court.
+_FILLS = np.array([_pixel('#e9ecef')] + [_pixel(COLORS[level]) for level in LEVELS])
+_OUTLINES = np.array([_pixel('#adb5bd')] + [_pixel(COLORS['border'])] * len(LEVELS))
+_INNER_RINGS = np.concatenate([_FILLS[:1], _OUTLINES[1:]])
+
+
+def _new_canvas(geo):
+    """Background-filled canvas, padded by one cell so a view of the whole grid always fits"""
+    canvas = np.empty((geo['height'] + geo['court_h'] + geo['spacing_y'],
+                       geo['width'] + geo['court_w'] + geo['spacing_x']), dtype=np.uint32)
+    canvas.fill(_pixel(COLORS['background']))
+    return canvas
+
+
+def _paint_grid(canvas, geo, kinds, admin_mode):
+    """Paint every court and empty slot of the grid into `canvas` with a few slice assignments.
+
+    The grid area is viewed as a rows x cell height x cols x cell width
+    array, so one assignment paints the same band of every cell at once,
+    each in its own colour. `kinds` is a rows x cols array of cell kinds.
+    The pixels covered are exactly those of PIL's rectangle and line calls.
+    """
+    rows, cols = kinds.shape
+    court_w, court_h = geo['court_w'], geo['court_h']
+    pitch_x, pitch_y = court_w + geo['spacing_x'], court_h + geo['spacing_y']
+    left, top = geo['margin_x'], geo['margin_y']
+    cells = canvas[top:top + rows * pitch_y, left:left + cols * pitch_x].reshape(rows, pitch_y, cols, pitch_x)
+
+    def per_cell(table):
+        return table[kinds][:, None, :, None]
+
+    cells[:, :court_h + 1, :, :court_w + 1] = per_cell(_OUTLINES)
+    cells[:, 1:court_h, :, 1:court_w] = per_cell(_INNER_RINGS)
+    cells[:, 2:court_h - 1, :, 2:court_w - 1] = per_cell(_FILLS)
+
+    if admin_mode and not kinds.all():
+        # Plus icon for empty slots
+        arm = min(15, court_w // 4, court_h // 4)
+        cx, cy = court_w // 2, court_h // 2
+        empty = (kinds == 0)[:, None, :, None]
+        for bar in (cells[:, cy:cy + 2, :, cx - arm:cx + arm + 1], cells[:, cy - arm:cy + arm + 1, :, cx:cx + 2]):
+            bar[...] = np.where(empty, _pixel('#6c757d'), bar)
+
+
+def _paint_box(canvas, x, y, w, h, fill, outline):
+    """Filled rectangle with a one pixel outline, bounds inclusive like PIL's"""
+    canvas[y:y + h + 1, x:x + w + 1] = _pixel(outline)
+    canvas[y + 1:y + h, x + 1:x + w] = _pixel(fill)
+
+
+def _canvas_image(canvas, geo):
+    size = (geo['width'], geo['height'])
+    return Image.frombuffer('RGBX', size, canvas, 'raw', 'RGBX', canvas.strides[0], 1).convert('RGB')
+
+
+def render_court_image_numpy(courts, settings, scale=1.0):
+    """Render the layout with all shapes painted on a NumPy array, and only text by PIL.
+
+    Produces the same picture as the tile renderer. It does no caching of
+    its own, so a layout that changes as a whole - a new grid size or scale -
+    costs a handful of array stores instead of a rectangle call per cell.
+    """
+    geo = compute_layout(settings, scale)
+    admin_mode = bool(settings.get('admin_mode'))
+    placed = _placed_courts(courts, geo)
+
+    kinds = np.zeros((geo['rows'], geo['cols']), dtype=np.intp)
+    for (row, col), (_, level) in placed.items():
+        kinds[row, col] = LEVELS.index(level) + 1
+
+    canvas = _new_canvas(geo)
+    _paint_grid(canvas, geo, kinds, admin_mode)
+    for level, (x, y, w, h) in zip(LEVELS, _legend_boxes(geo)):
+        _paint_box(canvas, x, y, w, h, COLORS[level], COLORS['border'])
+
+    img = _canvas_image(canvas, geo)
+    draw = ImageDraw.Draw(img)
+    title = settings.get('center_name', 'Team Baddies Badminton Center')
+    _draw_centered(draw, title, 0, geo['width'], round(15 * geo['ui_scale']), geo['title_size'], 50, 6)
+    spilling = _spilling_courts(placed, geo)
+    for (row, col), (name, level) in placed.items():
+        if (row, col) not in spilling:
+            x, y = _cell_origin(geo, row, col)
+            _draw_court_text(draw, x, y, geo['court_w'], name, level)
+    _draw_legend(draw, geo, boxes=False)
+    stats = _stats_text([c for c in courts if c.get("active", True)], len(placed))
+    _draw_centered(draw, stats, 0, geo['width'], _stats_y(geo), geo['small_size'], 50, 4)
+    _draw_spilling_text(draw, geo, spilling)
+    return img
+
+
+# layout_settings["render_backend"] -> renderer
+RENDER_BACKENDS = {
+    "tiles": _tile_renderer.render,
+    "numpy": render_court_image_numpy,
+}
+DEFAULT_RENDER_BACKEND = "tiles"
+
+
+def generate_court_image(courts, settings, scale=1.0):
+    """Generate court layout image"""
+    backend = RENDER_BACKENDS.get(settings.get('render_backend'), RENDER_BACKENDS[DEFAULT_RENDER_BACKEND])
+    return backend(courts, settings, scale)
+
+
+def _best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def benchmark_backends(grids=((10, 10), (20, 20), (40, 40), (60, 60)), settings=None, repeat=5):
+    """Time the PIL and NumPy backends on full grids of courts.
+
+    "shapes" is the court rectangles alone, drawn into an existing canvas -
+    a rectangle call per court against a few array stores. "full" is a
+    cold render of the whole image including text; the tile renderer is
+    recreated for every run so its caches never help.
+    """
+    results = []
+    for rows, cols in grids:
+        grid_settings = dict(settings or {}, rows=rows, cols=cols)
+        courts = [{"id": i + 1, "name": f"Court {i + 1}", "level": LEVELS[i % len(LEVELS)],
+                   "position": {"row": i // cols, "col": i % cols}} for i in range(rows * cols)]
+        geo = compute_layout(grid_settings)
+        placed = _placed_courts(courts, geo)
+        kinds = np.array([[LEVELS.index(placed[(r, c)][1]) + 1 for c in range(cols)] for r in range(rows)])
+
+        draw = ImageDraw.Draw(Image.new('RGB', (geo['width'], geo['height']), COLORS['background']))
+        canvas = _new_canvas(geo)
+
+        def pil_shapes():
+            for (row, col), (_, level) in placed.items():
+                x, y = _cell_origin(geo, row, col)
+                draw.rectangle([x, y, x + geo['court_w'], y + geo['court_h']],
+                               fill=COLORS[level], outline=COLORS['border'], width=2)
+
+        results.append({
+            "grid": f"{rows}x{cols}", "canvas": f"{geo['width']}x{geo['height']}",
+            "shapes_pil_ms": _best_ms(pil_shapes, repeat),
+            "shapes_numpy_ms": _best_ms(lambda: _paint_grid(canvas, geo, kinds, False), repeat),
+            "full_tiles_ms": _best_ms(lambda: TileRenderer().render(courts, grid_settings), repeat),
+            "full_numpy_ms": _best_ms(lambda: render_court_image_numpy(courts, grid_settings), repeat),
+        })
+    return results
+
+
+# Render Cache
+RENDER_CACHE_SIZE = 64
+# Designer preview size relative to the full image, set by layout_settings["preview_scale"]
+DEFAULT_PREVIEW_SCALE = 0.5
+# Settings that do not change the full-resolution image; every render backend draws the same pixels
+_UNRENDERED_SETTINGS = ("preview_scale", "render_backend")
+
+# layout key -> rendered image, shared by every session
+_render_cache = LRUCache(RENDER_CACHE_SIZE)
+RENDER_CACHE_STATS = _render_cache.stats
+
+
+def layout_key(courts, settings):
+    """Stable hash of everything that affects the rendered layout"""
+    active_courts = [c for c in courts if c.get("active", True)]
+    settings = {k: v for k, v in settings.items() if k not in _UNRENDERED_SETTINGS}
+    encoded = json.dumps([active_courts, settings], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def get_court_image(courts, settings, palette=False, scale=1.0):
+    """Return the layout image, drawing it only if this exact layout is not cached.
+
+    With `palette` the image is the quantized "P" mode version, which
+    Streamlit sends to the browser as a much smaller PNG. `scale` renders a
+    smaller canvas, used for the designer's live preview. The returned image
+    is shared between sessions and must not be modified.
+    """
+    return _cached_image(layout_key(courts, settings), courts, settings, palette, scale)
+
+
+def get_court_image_bytes(courts, settings, fmt="png8", scale=1.0):
+    """Return the layout encoded as `fmt`, encoding it once per layout version.
+
+    The bytes are shared by every session. Hand them straight to st.image
+    (as output_format="PNG" for the PNG formats) or a download button;
+    Streamlit passes PNG bytes through unchanged as long as the image is no
+    wider than its maximum content width, so repeat views cost no encoding.
+    """
+    key = layout_key(courts, settings)
+    return _cached_bytes(key, fmt, scale, lambda: _cached_image(key, courts, settings, fmt == "png8", scale))
+
+
+def get_preview_bytes(courts, settings):
+    """Reduced-size palette PNG for live previews while editing"""
+    return get_court_image_bytes(courts, settings, "png8", settings.get("preview_scale", DEFAULT_PREVIEW_SCALE))
+
+
+def _cached_image(key, courts, settings, palette, scale=1.0):
+    img = _render_cache.get((key, palette, scale))
+    if img is None:
+        if palette:
+            img = to_palette(_cached_image(key, courts, settings, False, scale))
+        else:
+            img = generate_court_image(courts, settings, scale)
+        _render_cache.put((key, palette, scale), img)
+    return img
+
+
+def _cached_bytes(key, fmt, scale, image):
+    # `image` returns the image to encode and is only called on a miss
+    data = _render_cache.get((key, fmt, scale))
+    if data is None:
+        data = encode_image(image(), fmt)
+        _render_cache.put((key, fmt, scale), data)
+    return data
+
+
+def lazy_court_image_bytes(courts, settings, fmt="png8"):
+    """Zero-argument callable that renders and encodes the layout when called, for st.download_button.
+
+    The layout is copied now, so later edits in the session do not leak into
+    the download; nothing is drawn until the download is requested, and the
+    result is kept in the render cache for the next download of the same
+    layout.
+    """
+    courts, settings = json.loads(json.dumps([courts, settings]))
+    if fmt == "svg":
+        return lambda: get_court_svg(courts, settings).encode("utf-8")
+    return lambda: get_court_image_bytes(courts, settings, fmt)
+
+
+# Output Encoding
+# The layout has a handful of flat colors plus anti-aliased text edges, which
+# a small adaptive palette reproduces without visible loss
+PALETTE_COLORS = 32
+
+# format -> (label, MIME type, file extension)
+ENCODINGS = {
+    "png8": ("PNG (palette)", "image/png", "png"),
+    "png": ("PNG", "image/png", "png"),
+    "webp": ("WebP (lossless)", "image/webp", "webp"),
+}
+
+
+def to_palette(img):
+    """Quantize an RGB layout image to a PALETTE_COLORS palette ("P" mode)"""
+    if img.mode == "P":
+        return img
+    return img.quantize(colors=PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+
+
+def encode_image(img, fmt="png8"):
+    """Encode a layout image as one of ENCODINGS and return the bytes"""
+    buffer = io.BytesIO()
+    if fmt == "png8":
+        to_palette(img).save(buffer, format="PNG", optimize=True)
+    elif fmt == "png":
+        img.save(buffer, format="PNG", optimize=True)
+    elif fmt == "webp":
+        img.save(buffer, format="WEBP", lossless=True, method=4)
+    else:
+        raise ValueError(f"Unknown image format: {fmt}")
+    return buffer.getvalue()
+
+
+def benchmark_encodings(img, formats=None):
+    """Encoded size and encode time of `img` in each format.
+
+    The first row is the plain RGB PNG the app used to send, for comparison.
+    """
+    results = []
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    img.save(buffer, format="PNG")
+    results.append({"format": "PNG (unoptimized RGB)", "bytes": len(buffer.getvalue()),
+                    "encode_ms": round((time.perf_counter() - start) * 1000, 1)})
+    for fmt in formats or ENCODINGS:
+        start = time.perf_counter()
+        data = encode_image(img, fmt)
+        results.append({"format": ENCODINGS[fmt][0], "bytes": len(data),
+                        "encode_ms": round((time.perf_counter() - start) * 1000, 1)})
+    return results
+
+
+# SVG Output
+# Same layout as the raster renderer. Text is centered with text-anchor,
+# so no font metrics are needed, and the markup is byte-for-byte
+# deterministic for a given layout.
+SVG_FONT_FAMILY = "DejaVu Sans, Arial, Helvetica, sans-serif"
+
+# Labels that are not in ENCODINGS because they are not encoded from a raster image
+DOWNLOAD_FORMATS = dict(ENCODINGS, svg=("SVG (vector)", "image/svg+xml", "svg"))
+
+
+def _svg_text(x, top, size, text, fill, anchor="middle"):
+    # SVG positions text by its baseline; PIL by its top edge
+    return (f'<text x="{x}" y="{top + round(size * 0.9)}" font-size="{size}" fill="{fill}" '
+            f'text-anchor="{anchor}">{html.escape(text)}</text>')
+
+
+def render_court_svg(courts, settings, scale=1.0):
+    """Render the court layout as an SVG document"""
+    geo = compute_layout(settings, scale)
+    width, height, ui_scale = geo['width'], geo['height'], geo['ui_scale']
+    court_w, court_h = geo['court_w'], geo['court_h']
+    name_size, level_size, name_y, level_y = _tile_text_layout(court_w)
+    placed = _placed_courts(courts, geo)
+    admin_mode = bool(settings.get('admin_mode'))
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="{SVG_FONT_FAMILY}">',
+        f'<rect width="{width}" height="{height}" fill="{COLORS["background"]}"/>',
+        _svg_text(width // 2, round(15 * ui_scale), geo['title_size'],
+                  settings.get('center_name', 'Team Baddies Badminton Center'), COLORS['border']),
+    ]
+    for row in range(geo['rows']):
+        for col in range(geo['cols']):
+            x, y = _cell_origin(geo, row, col)
+            court = placed.get((row, col))
+            if court is None:
+                parts.append(f'<rect x="{x}" y="{y}" width="{court_w}" height="{court_h}" '
+                             f'fill="#e9ecef" stroke="#adb5bd" stroke-width="1"/>')
+                if admin_mode:
+                    cx, cy, arm = x + court_w // 2, y + court_h // 2, min(15, court_w // 4, court_h // 4)
+                    parts.append(f'<path d="M{cx - arm} {cy}H{cx + arm}M{cx} {cy - arm}V{cy + arm}" '
+                                 f'stroke="#6c757d" stroke-width="2"/>')
+                continue
+            name, level = court
+            parts.append(f'<rect x="{x + 1}" y="{y + 1}" width="{court_w - 1}" height="{court_h - 1}" '
+                         f'fill="{COLORS[level]}" stroke="{COLORS["border"]}" stroke-width="2"/>')
+            if _has_label(court_w):
+                parts.append(_svg_text(x + court_w // 2, y + name_y, name_size, name, COLORS['text']))
+                parts.append(_svg_text(x + court_w // 2, y + level_y, level_size, level.title(), COLORS['text']))
+
+    legend_y = geo['legend_y']
+    box_w, box_h, text_dx = round(25 * ui_scale), round(18 * ui_scale), round(35 * ui_scale)
+    for i, level in enumerate(LEVELS):
+        x = round((80 + i * 160) * ui_scale)
+        parts.append(f'<rect x="{x}" y="{legend_y}" width="{box_w}" height="{box_h}" '
+                     f'fill="{COLORS[level]}" stroke="{COLORS["border"]}" stroke-width="1"/>')
+        parts.append(_svg_text(x + text_dx, legend_y + 2, geo['small_size'], level.title(), COLORS['border'], "start"))
+    stats = _stats_text([c for c in courts if c.get("active", True)], len(placed))
+    parts.append(_svg_text(width // 2, legend_y + round(30 * ui_scale), geo['small_size'], stats, COLORS['border']))
+    parts.append('</svg>')
+    return "\n".join(parts) + "\n"
+
+
+def get_court_svg(courts, settings):
+    """Cached SVG markup of the layout, shared by every session"""
+    key = (layout_key(courts, settings), "svg")
+    svg = _render_cache.get(key)
+    if svg is None:
+        svg = render_court_svg(courts, settings)
+        _render_cache.put(key, svg)
+    return svg
+
+
+if __name__ == "__main__":
+    # python court_render.py bench
+    if sys.argv[1:] != ["bench"]:
+        sys.exit("usage: python court_render.py bench")
+    columns = ["grid", "canvas", "shapes_pil_ms", "shapes_numpy_ms", "full_tiles_ms", "full_numpy_ms"]
+    print("  ".join(f"{c:>15}" for c in columns))
+    for row in benchmark_backends():
+        print("  ".join(f"{row[c]:>15}" for c in columns))
@@ -0,0 +1,138 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from court_render import DOWNLOAD_FORMATS, encode_image, generate_court_image, layout_key, render_court_svg
+from storage import COURTS_FILE
+
+EXPORT_DIR = "exports"
+# Snapshots of earlier layouts, court_layout.json shaped, exported along with the current one
+HISTORY_DIR = os.path.join(EXPORT_DIR, "history")
+
+DEFAULT_FORMATS = ["png8", "svg"]
+DEFAULT_SCALES = [1.0, 0.5]
+
+
+def save_layout_snapshot(courts_data, history_dir=HISTORY_DIR):
+    """Write the layout to the history directory and return the snapshot's path"""
+    os.makedirs(history_dir, exist_ok=True)
+    path = os.path.join(history_dir, f"court_layout_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(courts_data, f, indent=2)
+    return path
+
+
+def load_layout(path):
+    """(courts, layout settings) from a court_layout.json or a designer configuration export"""
+    with open(path) as f:
+        data = json.load(f)
+    if "layout_settings" in data:
+        return data.get("courts", []), data["layout_settings"]
+    # "📋 Export Configuration" shape: center name and grid at the top level
+    grid = data.get("grid", {})
+    settings = {"rows": grid.get("rows", 3), "cols": grid.get("cols", 4)}
+    if "center_name" in data:
+        settings["center_name"] = data["center_name"]
+    return data.get("courts", []), settings
+
+
+def output_name(key, fmt, scale):
+    """File name of one export, derived from the layout's content hash"""
+    return f"court_layout_{key[:16]}_{scale:g}x_{fmt}.{DOWNLOAD_FORMATS[fmt][2]}"
+
+
+def plan_exports(paths, formats, scales, out_dir=EXPORT_DIR):
+    """Exports still to render as (courts, settings, format, scale, output path), plus the skipped paths.
+
+    The same layout found in several files is exported once, and outputs
+    already on disk are skipped without rendering anything.
+    """
+    tasks, skipped, planned = [], [], set()
+    for path in paths:
+        courts, settings = load_layout(path)
+        key = layout_key(courts, settings)
+        for fmt in formats:
+            for scale in scales:
+                target = os.path.join(out_dir, output_name(key, fmt, scale))
+                if target in planned:
+                    continue
+                planned.add(target)
+                if os.path.exists(target):
+                    skipped.append(target)
+                else:
+                    tasks.append((courts, settings, fmt, scale, target))
+    return tasks, skipped
+
+
+def export_one(task):
+    """Render and encode one export and write it to disk; runs in a worker process"""
+    courts, settings, fmt, scale, target = task
+    if fmt == "svg":
+        data = render_court_svg(courts, settings, scale).encode("utf-8")
+    else:
+        data = encode_image(generate_court_image(courts, settings, scale), fmt)
+    # Written under a temporary name so an interrupted run never leaves a
+    # partial file that a later run would skip
+    tmp_path = f"{target}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+    return target, len(data)
+
+
+def export_layouts(paths, formats=DEFAULT_FORMATS, scales=DEFAULT_SCALES, out_dir=EXPORT_DIR, workers=None):
+    """Export every layout in `paths`, rendering in parallel.
+
+    Returns ([(path, bytes written)], [skipped paths]).
+    """
+    unknown = [fmt for fmt in formats if fmt not in DOWNLOAD_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown image format: {', '.join(unknown)}")
+    invalid = [scale for scale in scales if not (scale > 0 and math.isfinite(scale))]
+    if invalid:
+        raise ValueError(f"Scales must be positive: {', '.join(f'{s:g}' for s in invalid)}")
+    os.makedirs(out_dir, exist_ok=True)
+    tasks, skipped = plan_exports(paths, formats, scales, out_dir)
+    if len(tasks) <= 1 or workers == 1:
+        return [export_one(task) for task in tasks], skipped
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(export_one, tasks)), skipped
+
+
+def default_layout_paths():
+    """The current layout followed by every snapshot in the history directory"""
+    return [COURTS_FILE] + sorted(glob.glob(os.path.join(HISTORY_DIR, "*.json")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render court layouts into the exports directory.")
+    parser.add_argument("layouts", nargs="*",
+                        help=f"layout JSON files (default: {COURTS_FILE} and {HISTORY_DIR}/*.json)")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help=f"comma separated, any of {', '.join(DOWNLOAD_FORMATS)}")
+    parser.add_argument("--scales", default=",".join(f"{s:g}" for s in DEFAULT_SCALES),
+                        help="comma separated resolutions relative to the configured image size")
+    parser.add_argument("--out", default=EXPORT_DIR, help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    try:
+        scales = [float(s) for s in args.scales.split(",")]
+        written, skipped = export_layouts(args.layouts or default_layout_paths(), args.formats.split(","),
+                                          scales, args.out, args.workers)
+    except (OSError, ValueError) as e:
+        sys.exit(f"export failed: {e}")
+    for path, size in written:
+        print(f"wrote   {path} ({size} bytes)")
+    for path in skipped:
+        print(f"skipped {path} (up to date)")
+    print(f"{len(written)} written, {len(skipped)} already exported")
+
+
+if __name__ == "__main__":
+    main()
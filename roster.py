@@ -0,0 +1,252 @@
+import html
+from collections import deque
+from functools import lru_cache
+
+# Default capacities for a session day
+PLAYER_CAPACITY = 27
+WAITLIST_CAPACITY = 20
+
+SKILL_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+PLAYERS = "Players"
+WAITLIST = "Waitlist"
+# Optional per-day override: {"Players": 27, "Waitlist": 20}
+CAPACITY = "Capacity"
+
+
+def day_capacity(day_data):
+    """Return (player capacity, waitlist capacity) configured for a day"""
+    capacity = day_data.get(CAPACITY, {})
+    return capacity.get(PLAYERS, PLAYER_CAPACITY), capacity.get(WAITLIST, WAITLIST_CAPACITY)
+
+
+def skill_counts(day_data):
+    """Number of players (not waitlisted) per skill level, keyed by the lower-case court level"""
+    counts = {skill.lower(): 0 for skill in SKILL_LEVELS}
+    for _, skill in day_data.get(PLAYERS, []):
+        if skill.lower() in counts:
+            counts[skill.lower()] += 1
+    return counts
+
+
+def normalize_name(name):
+    """Key used to detect duplicate names: case-insensitive, whitespace collapsed"""
+    return " ".join(name.split()).casefold()
+
+
+class RosterEntry:
+    """A signed-up player and the list they are currently on"""
+
+    __slots__ = ("name", "skill", "list_name")
+
+    def __init__(self, name, skill, list_name):
+        self.name = name
+        self.skill = skill
+        self.list_name = list_name
+
+    def __repr__(self):
+        return f"RosterEntry({self.name!r}, {self.skill!r}, {self.list_name!r})"
+
+
+class Roster:
+    """One day's player list and waitlist with O(1) lookup and removal by name.
+
+    Active players live in an insertion-ordered dict of entries, and each
+    normalized name maps to its entries in sign-up order - normally just
+    one. The waitlist is a deque; removing someone from the middle of it
+    only detaches the entry, and detached entries are skipped (and
+    eventually compacted away) when the waitlist is read.
+    """
+
+    def __init__(self, capacity=PLAYER_CAPACITY, waitlist_capacity=WAITLIST_CAPACITY):
+        self.capacity = capacity
+        self.waitlist_capacity = waitlist_capacity
+        self._index = {}
+        self._players = {}
+        self._waitlist = deque()
+        self._waitlist_count = 0
+
+    @classmethod
+    def from_dict(cls, day_data):
+        """Build a roster from a day entry of player_list.json.
+
+        Capacities come from the day's optional "Capacity" entry. Repeated
+        names already in the file are kept as they are, so saving the roster
+        back never drops anyone; see duplicate_names.
+        """
+        roster = cls(*day_capacity(day_data))
+        for list_name in (PLAYERS, WAITLIST):
+            for name, skill in day_data.get(list_name, []):
+                roster._insert(RosterEntry(name, skill, list_name))
+        return roster
+
+    def to_dict(self):
+        """Serialize the two lists to the player_list.json day shape"""
+        return {
+            PLAYERS: [[e.name, e.skill] for e in self._players],
+            WAITLIST: [[e.name, e.skill] for e in self.waitlist],
+        }
+
+    # Lookup and counting
+    def __contains__(self, name):
+        return normalize_name(name) in self._index
+
+    def __len__(self):
+        return len(self._players) + self._waitlist_count
+
+    def get(self, name):
+        """Return the (first) entry for `name`, or None if they are not signed up"""
+        entries = self._index.get(normalize_name(name))
+        return entries[0] if entries else None
+
+    @property
+    def players(self):
+        return list(self._players)
+
+    @property
+    def waitlist(self):
+        return [e for e in self._waitlist if e.list_name == WAITLIST]
+
+    @property
+    def version(self):
+        """Hashable snapshot of both lists, used as a render cache key"""
+        return (tuple((e.name, e.skill) for e in self._players),
+                tuple((e.name, e.skill) for e in self.waitlist))
+
+    @property
+    def duplicate_names(self):
+        """Names signed up more than once, as stored in files written before add() checked"""
+        return [entries[0].name for entries in self._index.values() if len(entries) > 1]
+
+    @property
+    def player_count(self):
+        return len(self._players)
+
+    @property
+    def waitlist_count(self):
+        return self._waitlist_count
+
+    # Mutation
+    def add(self, name, skill):
+        """Sign up `name`, returning the list they landed on or None if both are full.
+
+        Raises ValueError for a blank name or a name that is already signed up.
+        """
+        name = " ".join(name.split())
+        if not name:
+            raise ValueError("Please enter a name.")
+        existing = self.get(name)
+        if existing is not None:
+            where = "player list" if existing.list_name == PLAYERS else "waitlist"
+            raise ValueError(f"{existing.name} is already on the {where}.")
+        if self.player_count < self.capacity:
+            list_name = PLAYERS
+        elif self._waitlist_count < self.waitlist_capacity:
+            list_name = WAITLIST
+        else:
+            return None
+        self._insert(RosterEntry(name, skill, list_name))
+        return list_name
+
+    def remove(self, name):
+        """Remove `name` from whichever list they are on and return their entry.
+
+        When the name is signed up more than once, the entry spelled exactly
+        like `name` goes first, otherwise the earliest. Raises KeyError if
+        they are not signed up.
+        """
+        key = normalize_name(name)
+        entries = self._index[key]
+        entry = next((e for e in entries if e.name == name), entries[0])
+        entries.remove(entry)
+        if not entries:
+            del self._index[key]
+        list_name, entry.list_name = entry.list_name, None
+        if list_name == PLAYERS:
+            del self._players[entry]
+        else:
+            self._waitlist_count -= 1
+            self._compact_waitlist()
+        return entry
+
+    def remove_many(self, names):
+        """Remove several players in one batch, then fill freed places from the waitlist.
+
+        Names that are not signed up are ignored. Returns (removed entries,
+        promoted entries) so the caller can record each change.
+        """
+        removed = [self.remove(name) for name in names if name in self]
+        return removed, self.promote()
+
+    def set_capacity(self, capacity, waitlist_capacity):
+        """Change the day's capacities and promote into any new places.
+
+        Lowering a capacity never bumps players who are already on a list.
+        Returns the promoted entries.
+        """
+        self.capacity = capacity
+        self.waitlist_capacity = waitlist_capacity
+        return self.promote()
+
+    def promote(self):
+        """Move waitlisted players onto the player list, first come first served, until it is full"""
+        promoted = []
+        while self.player_count < self.capacity and self._waitlist_count:
+            entry = self._waitlist.popleft()
+            if entry.list_name != WAITLIST:
+                continue
+            self._waitlist_count -= 1
+            entry.list_name = PLAYERS
+            self._players[entry] = None
+            promoted.append(entry)
+        self._compact_waitlist()
+        return promoted
+
+    def _insert(self, entry):
+        self._index.setdefault(normalize_name(entry.name), []).append(entry)
+        if entry.list_name == PLAYERS:
+            # Used as an ordered set; entries hash by identity
+            self._players[entry] = None
+        else:
+            self._waitlist.append(entry)
+            self._waitlist_count += 1
+
+    def _compact_waitlist(self):
+        # Drop detached entries from the front in O(1) each, and rebuild
+        # only once they make up most of the deque
+        while self._waitlist and self._waitlist[0].list_name != WAITLIST:
+            self._waitlist.popleft()
+        if len(self._waitlist) > 2 * self._waitlist_count + 8:
+            self._waitlist = deque(e for e in self._waitlist if e.list_name == WAITLIST)
+
+
+# HTML rendering
+_ROW_TEMPLATE = (
+    "<div style='display: flex; justify-content: space-between; align-items: center; "
+    "padding: 0.5rem; margin: 0.25rem 0; background: {background}; border-radius: 5px;'>"
+    "<span><strong>{number}.</strong> {name}</span>"
+    "<span class='skill-{skill_class}'>{skill}</span></div>"
+)
+
+
+def _rows_html(entries, background):
+    return "".join(
+        _ROW_TEMPLATE.format(background=background, number=i, name=html.escape(name),
+                             skill_class=html.escape(skill.lower(), quote=True), skill=html.escape(skill))
+        for i, (name, skill) in enumerate(entries, 1))
+
+
+@lru_cache(maxsize=64)
+def roster_html(version):
+    """Render the player list and the waitlist as one HTML fragment each.
+
+    `version` is Roster.version, so an unchanged roster is served from the
+    cache. Either fragment is empty when its list is.
+    """
+    players, waitlist = version
+    players_html = waitlist_html = ""
+    if players:
+        players_html = "<p><strong>Active Players:</strong></p>" + _rows_html(players, "#f8f9fa")
+    if waitlist:
+        waitlist_html = _rows_html(waitlist, "#fff3cd")
+    return players_html, waitlist_html
@@ -0,0 +1,376 @@
+import html
+import json
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from court_layout import LEVELS, PLAYERS_PER_COURT, court_position
+
+
+def _rank(level):
+    """Index of a skill or court level in LEVELS; unknown levels sort after all of them"""
+    level = (level or "").lower()
+    return LEVELS.index(level) if level in LEVELS else len(LEVELS)
+
+
+def assign_courts(players, courts, per_court=PLAYERS_PER_COURT):
+    """Put a day's players on the active courts by skill level.
+
+    `players` is the day's [name, skill] list in priority order (sign-up
+    order) and `courts` the court dicts of court_layout.json; inactive ones
+    are ignored and the rest are filled in grid order. Each level's players
+    go to that level's courts first. Players left over then take free places
+    on the nearest level's courts, part-filled courts before empty ones, so
+    a level with too many players borrows from one with too few. Finally
+    short courts are merged so as many players as possible play doubles.
+    Whoever still has no place sits out; those are the latest sign-ups of
+    the levels that overflowed.
+
+    Runs in O(players + courts x levels). Returns (assignments, sitting out)
+    where assignments is [{"court": court, "players": [[name, skill], ...]}]
+    for every active court and sitting out is [[name, skill], ...] in
+    priority order.
+    """
+    assignments, sitting_out = _place(players, courts, per_court)
+    for slot in assignments:
+        slot["players"] = [player for _, player in slot["players"]]
+    return assignments, [player for _, player in sitting_out]
+
+
+def _place(players, courts, per_court):
+    """assign_courts() with every player as an (index in `players`, entry) pair"""
+    levels = len(LEVELS) + 1
+    assignments = [{"court": court, "players": []} for court in sorted(
+        (c for c in courts if c.get("active", True)), key=court_position)]
+    by_level = [[] for _ in range(levels)]
+    for slot in assignments:
+        by_level[_rank(slot["court"].get("level"))].append(slot)
+
+    # Players by level in priority order, each tagged with its position in `players`
+    waiting = [[] for _ in range(levels)]
+    for order, (name, skill) in enumerate(players):
+        waiting[_rank(skill)].append((order, [name, skill]))
+
+    # Home level first: fill the level's courts one after another
+    for rank in range(levels):
+        queue, start = waiting[rank], 0
+        for slot in by_level[rank]:
+            taken = queue[start:start + per_court]
+            slot["players"].extend(taken)
+            start += len(taken)
+        waiting[rank] = queue[start:]
+
+    # Overflow to the nearest level with room, lower levels first on a tie
+    for slots in by_level:
+        slots.sort(key=lambda slot: -len(slot["players"]))
+    for distance in range(1, levels):
+        for rank in range(levels):
+            for target in (rank - distance, rank + distance):
+                if waiting[rank] and 0 <= target < levels:
+                    waiting[rank] = _fill(by_level[target], waiting[rank], per_court)
+
+    # Merge short courts, moving the latest sign-ups of the emptiest to the nearest level's
+    short = [slot for slot in assignments if 0 < len(slot["players"]) < per_court]
+    while len(short) > 1:
+        short.sort(key=lambda slot: len(slot["players"]))
+        donor = short.pop(0)
+        rank = _rank(donor["court"].get("level"))
+        short.sort(key=lambda slot: abs(_rank(slot["court"].get("level")) - rank))
+        donor["players"] = _fill(short, donor["players"][::-1], per_court)[::-1]
+        short = [slot for slot in short if len(slot["players"]) < per_court]
+        if donor["players"]:
+            short.append(donor)
+
+    for slot in assignments:
+        slot["players"].sort()
+    return assignments, sorted(player for queue in waiting for player in queue)
+
+
+def _fill(slots, queue, per_court):
+    """Move players from the front of `queue` into the free places of `slots`; returns the rest"""
+    start = 0
+    for slot in slots:
+        if start == len(queue):
+            break
+        taken = queue[start:start + per_court - len(slot["players"])]
+        slot["players"].extend(taken)
+        start += len(taken)
+    return queue[start:]
+
+
+# Pairing
+# Team strength counts each player's level as 1, 2, 3...; unknown skills count as the middle level
+_RATINGS = np.arange(1, len(LEVELS) + 2, dtype=np.float64)
+_RATINGS[len(LEVELS)] = (len(LEVELS) + 1) / 2
+# The three ways to split four court places into two sides, as (split, side, place)
+_SPLIT_PLACES = np.array([[[0, 1], [2, 3]], [[0, 2], [1, 3]], [[0, 3], [1, 2]]])
+_SPLITS = _SPLIT_PLACES.tolist()
+
+
+def skill_ratings(players):
+    """Rating of each [name, skill] entry as a float array"""
+    return _RATINGS[[_rank(skill) for _, skill in players]]
+
+
+def _court_index(groups, empty):
+    """(courts, 4) array of each court's player indexes, padded with `empty`"""
+    index = np.full((len(groups), PLAYERS_PER_COURT), empty)
+    for row, group in enumerate(groups):
+        index[row, :len(group)] = group
+    return index
+
+
+def split_costs(groups, ratings):
+    """Imbalance of every split of every court, as a (courts, 3) matrix.
+
+    `groups` is a (courts, 4) array of indexes into `ratings`; an index of
+    len(ratings) marks an empty place. Each court gets a 4 x 4 matrix of the
+    strength of every side of two its players can form, so a split costs
+    one lookup per side.
+    """
+    court_ratings = np.append(ratings, 0.0)[groups]
+    pair_strength = court_ratings[:, :, None] + court_ratings[:, None, :]
+    sides = pair_strength[:, _SPLIT_PLACES[..., 0], _SPLIT_PLACES[..., 1]]
+    return np.abs(sides[..., 0] - sides[..., 1])
+
+
+def balance_courts(groups):
+    """Split each court's players into the two most even sides, every court in one batch.
+
+    `groups` is a list of courts, each a list of up to four [name, skill]
+    entries, such as the players of assign_courts(). Three players are
+    split two against one and two play singles. Returns [(sides, skill gap)]
+    per court, sides being two lists of entries and the gap the difference
+    in summed ratings.
+    """
+    if any(len(group) > PLAYERS_PER_COURT for group in groups):
+        raise ValueError(f"A court holds at most {PLAYERS_PER_COURT} players")
+    players = [player for group in groups for player in group]
+    empty = len(players)
+    starts = np.cumsum([0] + [len(group) for group in groups])
+    index = _court_index([range(start, start + len(group)) for start, group in zip(starts, groups)], empty)
+
+    costs = split_costs(index, skill_ratings(players))
+    best = costs.argmin(axis=1)
+    chosen = index[np.arange(len(groups))[:, None, None], _SPLIT_PLACES[best]]
+    return [([[players[i] for i in side if i != empty] for side in sides], float(gap))
+            for sides, gap in zip(chosen.tolist(), costs[np.arange(len(groups)), best])]
+
+
+# Rotation
+# Cost of pairing two players again as partners, and of putting them on opposite sides again
+PARTNER_WEIGHT = 2
+OPPONENT_WEIGHT = 1
+# Cost per rating point of skill gap between the sides; an uneven match is
+# worse than several repeats, so courts stay as balanced as balance_courts() makes them
+BALANCE_WEIGHT = 10
+# Rounds of swapping players between courts before settling for the current grouping
+SWAP_PASSES = 4
+# Courts further along its level that each court swaps with per pass, so a
+# round costs O(courts) however many courts share a level
+SWAP_NEIGHBOURS = 3
+# Swaps tried per round at most, which keeps a round of a big venue well under a second
+SWAP_BUDGET = 1000
+
+
+def _splits(group):
+    """The three ways to split a court's places into two sides, in split_costs() order.
+
+    Empty places are left out, so three players split two against one.
+    """
+    places = list(group) + [None] * (PLAYERS_PER_COURT - len(group))
+    return [tuple(tuple(places[p] for p in side if places[p] is not None) for side in split)
+            for split in _SPLITS]
+
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def _best_split(group, partners, opponents, gaps):
+    """(cost, sides) of the cheapest split of `group` given the pairings so far.
+
+    `gaps` is the court's row of split_costs(), the skill gap of each split.
+    """
+    best = None
+    for sides, gap in zip(_splits(group), gaps):
+        cost = BALANCE_WEIGHT * gap
+        for side in sides:
+            for i, a in enumerate(side):
+                for b in side[i + 1:]:
+                    cost += PARTNER_WEIGHT * partners[_pair(a, b)]
+        for a in sides[0]:
+            for b in sides[1]:
+                cost += OPPONENT_WEIGHT * opponents[_pair(a, b)]
+        if best is None or cost < best[0]:
+            best = (cost, sides)
+    return best
+
+
+def _mix_courts(groups, gaps, court_ranks, player_ranks, partners, opponents):
+    """Swap same-skill players between courts of the same level while that lowers the total cost.
+
+    Each court only tries the next SWAP_NEIGHBOURS courts of its level
+    (wrapping round), which covers every pair of a level of up to seven
+    courts, and no more than SWAP_BUDGET swaps are tried. A swap keeps the
+    rating of every place, so each court's `gaps` stay valid.
+    """
+    costs = [_best_split(group, partners, opponents, gaps[x])[0] for x, group in enumerate(groups)]
+    levels = {}
+    for x, rank in enumerate(court_ranks):
+        levels.setdefault(rank, []).append(x)
+    pairs = []
+    for level in levels.values():
+        reach = min(SWAP_NEIGHBOURS, len(level) // 2)
+        for k, x in enumerate(level):
+            for step in range(1, reach + 1):
+                y = level[(k + step) % len(level)]
+                # An even level reaches its opposite court from both sides; try it once
+                if 2 * step < len(level) or k < len(level) // 2:
+                    pairs.append((x, y))
+    budget = SWAP_BUDGET
+    for _ in range(SWAP_PASSES):
+        improved = False
+        for x, y in pairs:
+            gx, gy = groups[x], groups[y]
+            for i in range(len(gx)):
+                for j in range(len(gy)):
+                    if player_ranks[gx[i]] != player_ranks[gy[j]]:
+                        continue
+                    if not budget:
+                        return
+                    budget -= 1
+                    gx[i], gy[j] = gy[j], gx[i]
+                    cx = _best_split(gx, partners, opponents, gaps[x])[0]
+                    cy = _best_split(gy, partners, opponents, gaps[y])[0]
+                    if cx + cy < costs[x] + costs[y]:
+                        costs[x], costs[y], improved = cx, cy, True
+                    else:
+                        gx[i], gy[j] = gy[j], gx[i]
+        if not improved:
+            break
+
+
+def schedule_rounds(players, courts, rounds, per_court=PLAYERS_PER_COURT):
+    """Plan `rounds` rounds of play for a day.
+
+    Each round goes through assign_courts() with the players who have sat
+    out most so far first in line, so sit-outs are spread as evenly as the
+    skill levels allow. Players of the same skill are then swapped
+    between courts of the same level, and each court takes the cheapest of
+    its three splits into sides. A split costs its skill gap from
+    split_costs() (weighted BALANCE_WEIGHT) plus the partners (PARTNER_WEIGHT)
+    and opponents (OPPONENT_WEIGHT) it repeats, so sides are as even as
+    balance_courts() makes them and repeats decide between equally even
+    splits.
+
+    Players are told apart by their place in `players`, so two entries
+    with the same name are still two players. Returns one
+    {"courts": [{"court": court, "sides": [side, side]}], "sitting_out": [...]}
+    per round, where sides and the sitting out list hold [name, skill] entries.
+    """
+    players = [[name, skill] for name, skill in players]
+    player_ranks = [_rank(skill) for _, skill in players]
+    ratings = skill_ratings(players)
+    sat_out = [0] * len(players)
+    partners, opponents = Counter(), Counter()
+    schedule = []
+    for _ in range(rounds):
+        order = sorted(range(len(players)), key=lambda i: (-sat_out[i], i))
+        assignments, sitting_out = _place([players[i] for i in order], courts, per_court)
+        groups = [sorted(order[k] for k, _ in a["players"]) for a in assignments]
+        gaps = split_costs(_court_index(groups, len(players)), ratings).tolist()
+        court_ranks = [_rank(a["court"].get("level")) for a in assignments]
+        _mix_courts(groups, gaps, court_ranks, player_ranks, partners, opponents)
+
+        round_courts = []
+        for assignment, group, court_gaps in zip(assignments, groups, gaps):
+            _, sides = _best_split(group, partners, opponents, court_gaps)
+            for side in sides:
+                for i, a in enumerate(side):
+                    for b in side[i + 1:]:
+                        partners[_pair(a, b)] += 1
+            for a in sides[0]:
+                for b in sides[1]:
+                    opponents[_pair(a, b)] += 1
+            round_courts.append({"court": assignment["court"],
+                                 "sides": [[players[i] for i in side] for side in sides]})
+        for k, _ in sitting_out:
+            sat_out[order[k]] += 1
+        schedule.append({"courts": round_courts, "sitting_out": [players[order[k]] for k, _ in sitting_out]})
+    return schedule
+
+
+@lru_cache(maxsize=32)
+def rotation_schedule(players, courts, rounds):
+    """schedule_rounds() for reruns that show the same plan again.
+
+    `players` is the player part of Roster.version and `courts` the court
+    list as JSON, so an unchanged day is served from the cache. The result
+    is shared between sessions and must not be modified.
+    """
+    return schedule_rounds(players, json.loads(courts), rounds)
+
+
+def rotation_stats(schedule):
+    """Sit-outs per player name and the number of repeated partnerships and match-ups in a schedule"""
+    sat_out, partners, opponents = Counter(), Counter(), Counter()
+    for round_ in schedule:
+        for name, _ in round_["sitting_out"]:
+            sat_out[name] += 1
+        for court in round_["courts"]:
+            sides = [[name for name, _ in side] for side in court["sides"]]
+            for side in sides:
+                for i, a in enumerate(side):
+                    for b in side[i + 1:]:
+                        partners[_pair(a, b)] += 1
+            if len(sides) == 2:
+                for a in sides[0]:
+                    for b in sides[1]:
+                        opponents[_pair(a, b)] += 1
+    return {
+        "sat_out": sat_out,
+        "repeated_partners": sum(n - 1 for n in partners.values()),
+        "repeated_opponents": sum(n - 1 for n in opponents.values()),
+    }
+
+
+# HTML rendering
+_COURT_TEMPLATE = (
+    "<div class='card' style='padding: 1rem;'>"
+    "<div style='display: flex; justify-content: space-between; align-items: center;'>"
+    "<strong>{name}</strong><span class='skill-{level_class}'>{level}</span></div>{players}</div>"
+)
+_PLAYER_TEMPLATE = (
+    "<div style='display: flex; justify-content: space-between; align-items: center; "
+    "padding: 0.25rem 0.5rem; margin: 0.25rem 0; background: #f8f9fa; border-radius: 5px;'>"
+    "<span>{name}</span><span class='skill-{skill_class}'>{skill}</span></div>"
+)
+
+
+def _players_html(players):
+    return "".join(
+        _PLAYER_TEMPLATE.format(name=html.escape(name), skill_class=html.escape(skill.lower(), quote=True),
+                                skill=html.escape(skill))
+        for name, skill in players)
+
+
+def court_html(assignment):
+    """One court of assign_courts() as a card listing its players.
+
+    When the assignment also has "sides" and "gap", as balance_courts()
+    gives them, the two sides are shown facing each other.
+    """
+    court = assignment["court"]
+    level = court.get("level", "")
+    if not assignment["players"]:
+        players = "<p style='color: #6c757d;'>No players</p>"
+    elif "sides" in assignment:
+        players = "<p style='text-align: center; margin: 0.25rem 0;'><strong>vs</strong></p>".join(
+            _players_html(side) for side in assignment["sides"] if side)
+        players += f"<p style='color: #6c757d; font-size: 0.8rem; margin: 0;'>Skill gap: {assignment['gap']:g}</p>"
+    else:
+        players = _players_html(assignment["players"])
+    return _COURT_TEMPLATE.format(name=html.escape(court.get("name", "")), level=html.escape(level.title()),
+                                  level_class=html.escape(level, quote=True), players=players)
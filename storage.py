@@ -0,0 +1,543 @@
+import atexit
+import hashlib
+import json
+import marshal
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Data files
+PLAYERS_FILE = "player_list.json"
+COURTS_FILE = "court_layout.json"
+AUDIT_FILE = "audit_trail.json"
+AUDIT_LOG_FILE = "audit_trail.jsonl"
+SQLITE_FILE = "team_baddies.db"
+
+# "json" (default) or "sqlite"
+STORAGE_BACKEND = os.environ.get("TEAM_BADDIES_STORAGE", "json")
+
+
+def _digest(data):
+    """Stable fingerprint of a JSON document"""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+# Parsed JSON files shared by every session in the process:
+# path -> ((mtime_ns, size, inode), marshalled document, digest)
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+JSON_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class JsonBackend:
+    """Stores each document as an indented JSON file.
+
+    Reads go through a process-wide cache keyed on each file's mtime, size
+    and inode, so an unchanged file is not parsed again. The cache keeps an
+    immutable marshalled snapshot and every read unmarshals a private copy,
+    so one session's edits never leak into another's view before they are
+    saved (marshal.loads is several times faster than json.load).
+    """
+
+    def read(self, name):
+        """Return (document, digest), or (None, None) if the file does not exist"""
+        try:
+            key = _file_key(name)
+        except FileNotFoundError:
+            return None, None
+        with _json_cache_lock:
+            cached = _json_cache.get(name)
+        if cached is not None and cached[0] == key:
+            JSON_CACHE_STATS["hits"] += 1
+            return marshal.loads(cached[1]), cached[2]
+        JSON_CACHE_STATS["misses"] += 1
+        try:
+            with open(name, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        digest = _digest(data)
+        with _json_cache_lock:
+            _json_cache[name] = (key, marshal.dumps(data), digest)
+        return data, digest
+
+    def write(self, name, data, digest=None):
+        # Write a new file and swap it in: readers in other processes never
+        # see a half-written document, and the new inode changes the cache
+        # key even when size and mtime come out the same
+        tmp_path = f"{name}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, name)
+        # Publish what was just written so the next read is a cache hit
+        with _json_cache_lock:
+            _json_cache[name] = (_file_key(name), marshal.dumps(data), digest or _digest(data))
+
+
+class DataStore:
+    """Loads the data documents and only rewrites the ones that changed.
+
+    A fingerprint of every document is taken when it is loaded; on save the
+    document is written only if it was marked dirty or its fingerprint no
+    longer matches. Counters record how many writes were performed and how
+    many were avoided. Documents are named after their JSON file whichever
+    backend is in use.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or make_backend()
+        self._digests = {}
+        self._dirty = set()
+        self.stats = {"writes": 0, "skipped": 0}
+
+    def load(self, name, default):
+        """Load a document, falling back to `default` if it does not exist yet"""
+        data, digest = self.backend.read(name)
+        if data is None:
+            data = default
+            # Nothing stored yet, so the first save always writes
+            self._digests.pop(name, None)
+        else:
+            self._digests[name] = digest or _digest(data)
+        self._dirty.discard(name)
+        return data
+
+    def mark_dirty(self, name):
+        """Force the next save of `name` to write"""
+        self._dirty.add(name)
+
+    def save(self, name, data):
+        """Write `data` if it changed since it was loaded; returns True if written"""
+        digest = _digest(data)
+        if name not in self._dirty and self._digests.get(name) == digest:
+            self.stats["skipped"] += 1
+            return False
+        self.backend.write(name, data, digest)
+        self._digests[name] = digest
+        self._dirty.discard(name)
+        self.stats["writes"] += 1
+        return True
+
+
+def migrate_audit_trail(json_path=AUDIT_FILE, log_path=AUDIT_LOG_FILE):
+    """One-time conversion of the legacy audit_trail.json array into JSON lines.
+
+    Does nothing once `log_path` exists. The legacy file is left in place.
+    Returns the number of migrated entries.
+    """
+    if os.path.exists(log_path) or not os.path.exists(json_path):
+        return 0
+    with open(json_path, "r") as f:
+        entries = json.load(f)
+    tmp_path = log_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, log_path)
+    return len(entries)
+
+
+class AuditLog:
+    """Append-only audit trail stored as one JSON object per line.
+
+    Appends are O(1): each entry is written and flushed straight away, while
+    the more expensive fsync is batched every `sync_every` entries or
+    `sync_interval` seconds, and once more at interpreter exit.
+    """
+
+    def __init__(self, path=AUDIT_LOG_FILE, sync_every=20, sync_interval=5.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, entry):
+        """Append a single entry to the log"""
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if (self._pending >= self.sync_every or
+                    time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync_locked()
+
+    def sync(self):
+        """fsync any entries written since the last sync"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def entries(self):
+        """Read every entry in the log, oldest first"""
+        try:
+            with open(self.path, "r") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def close(self):
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# One log per path, shared by every session in the process
+_audit_logs = {}
+_audit_logs_lock = threading.Lock()
+
+
+def get_audit_log(path=AUDIT_LOG_FILE, legacy_path=AUDIT_FILE):
+    """Return the shared audit log for the configured backend.
+
+    With the JSON backend the legacy audit_trail.json is migrated on first use.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        path, legacy_path = SQLITE_FILE, None
+    with _audit_logs_lock:
+        log = _audit_logs.get(path)
+        if log is None:
+            if STORAGE_BACKEND == "sqlite":
+                log = SqliteAuditLog(path)
+            else:
+                if legacy_path:
+                    migrate_audit_trail(legacy_path, path)
+                log = AuditLog(path)
+            _audit_logs[path] = log
+            atexit.register(log.close)
+        return log
+
+
+def add_audit_log(audit, action, details, user_type="user"):
+    """Append entry to the audit log"""
+    audit.append({
+        "action": action, "details": details, "user_type": user_type,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+def make_backend(name=None):
+    """Create the storage backend selected by `name` or TEAM_BADDIES_STORAGE"""
+    name = name or STORAGE_BACKEND
+    if name == "json":
+        return JsonBackend()
+    if name == "sqlite":
+        return SqliteBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+# SQLite Storage
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    ord INTEGER NOT NULL,
+    settings TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS roster (
+    day TEXT NOT NULL REFERENCES days(day) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    skill TEXT NOT NULL,
+    PRIMARY KEY (day, seq)
+);
+CREATE TABLE IF NOT EXISTS waitlist (
+    day TEXT NOT NULL REFERENCES days(day) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    skill TEXT NOT NULL,
+    PRIMARY KEY (day, seq)
+);
+CREATE INDEX IF NOT EXISTS roster_name ON roster (day, name);
+CREATE INDEX IF NOT EXISTS waitlist_name ON waitlist (day, name);
+CREATE TABLE IF NOT EXISTS courts (
+    seq INTEGER PRIMARY KEY,
+    court_id INTEGER,
+    name TEXT,
+    level TEXT,
+    row INTEGER,
+    col INTEGER,
+    active INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS courts_position ON courts (row, col);
+CREATE TABLE IF NOT EXISTS court_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT,
+    details TEXT,
+    user_type TEXT,
+    timestamp TEXT
+);
+"""
+
+# PRAGMA user_version once the JSON files have been imported
+SEEDED_VERSION = 1
+
+# Day dictionary keys mapped to their tables
+_LIST_TABLES = {"Players": "roster", "Waitlist": "waitlist"}
+
+
+def connect_sqlite(path=SQLITE_FILE):
+    """Open `path` in WAL mode, creating the schema and importing the JSON files if it is new"""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    # user_version marks a database the JSON files were imported into. It is
+    # checked and set under the write lock, so only one connection of one
+    # process ever imports, even when there was nothing to import.
+    conn.execute("BEGIN IMMEDIATE")
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+        # Databases seeded before the marker existed already hold the days
+        if conn.execute("SELECT COUNT(*) FROM days").fetchone()[0] == 0:
+            import_json_files(conn)
+        conn.execute(f"PRAGMA user_version = {SEEDED_VERSION}")
+    conn.commit()
+    return conn
+
+
+class SqliteBackend:
+    """Stores the player and court documents in SQLite tables.
+
+    Player lists are saved as row-level changes against what this backend
+    last read, so registering or removing a player touches a single row
+    instead of rewriting the whole document.
+    """
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        # day -> (ord, settings) and (day, list name) -> [(seq, name, skill)]
+        # as last read or written
+        self._days = {}
+        self._rows = {}
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = connect_sqlite(self.path)
+        return self._conn
+
+    def read(self, name):
+        """Return (document, None), or (None, None) if nothing is stored yet"""
+        with self._lock:
+            if name == PLAYERS_FILE:
+                return self._read_players(), None
+            if name == COURTS_FILE:
+                return self._read_courts(), None
+        raise KeyError(name)
+
+    def write(self, name, data, digest=None):
+        with self._lock, self.conn:
+            # Take the write lock up front so sequence numbers read below stay
+            # valid until commit, whatever other sessions or processes do
+            self.conn.execute("BEGIN IMMEDIATE")
+            if name == PLAYERS_FILE:
+                self._write_players(data)
+            elif name == COURTS_FILE:
+                self._write_courts(data)
+            else:
+                raise KeyError(name)
+
+    def _read_players(self):
+        days = self.conn.execute("SELECT day, ord, settings FROM days ORDER BY ord").fetchall()
+        if not days:
+            return None
+        self._days = {day: (ord_, settings) for day, ord_, settings in days}
+        players = {}
+        for day, _, settings in days:
+            players[day] = dict(json.loads(settings))
+            for key, table in _LIST_TABLES.items():
+                rows = self.conn.execute(
+                    f"SELECT seq, name, skill FROM {table} WHERE day = ? ORDER BY seq", (day,)).fetchall()
+                self._rows[(day, key)] = rows
+                players[day][key] = [[name, skill] for _, name, skill in rows]
+        return players
+
+    def _write_players(self, players):
+        conn = self.conn
+        if set(self._days) - set(players):
+            conn.execute(f"DELETE FROM days WHERE day NOT IN ({','.join('?' * len(players))})", list(players))
+        days = {}
+        for ord_, (day, lists) in enumerate(players.items()):
+            settings = json.dumps({k: v for k, v in lists.items() if k not in _LIST_TABLES}, sort_keys=True)
+            days[day] = (ord_, settings)
+            if self._days.get(day) != days[day]:
+                conn.execute(
+                    "INSERT INTO days (day, ord, settings) VALUES (?, ?, ?) "
+                    "ON CONFLICT (day) DO UPDATE SET ord = excluded.ord, settings = excluded.settings",
+                    (day, ord_, settings))
+            for key, table in _LIST_TABLES.items():
+                self._sync_list(table, day, key, lists.get(key, []))
+        self._days = days
+
+    def _sync_list(self, table, day, key, entries):
+        """Bring one list in line with `entries` using row-level deletes and appends.
+
+        Rows other sessions added since this one last read are left alone.
+        """
+        old = self._rows.get((day, key))
+        if old is None:
+            old = self.conn.execute(
+                f"SELECT seq, name, skill FROM {table} WHERE day = ? ORDER BY seq", (day,)).fetchall()
+        kept, deleted = [], []
+        j = 0
+        # Old rows that still appear in order are kept; anything else is deleted
+        for seq, name, skill in old:
+            if j < len(entries) and [name, skill] == list(entries[j]):
+                kept.append((seq, name, skill))
+                j += 1
+            else:
+                deleted.append((day, seq))
+        # Whatever is left in `entries` is appended after every stored row,
+        # including rows other sessions appended since this one last read
+        next_seq = self.conn.execute(
+            f"SELECT COALESCE(MAX(seq), 0) + 1 FROM {table} WHERE day = ?", (day,)).fetchone()[0]
+        added = [(day, next_seq + i, name, skill) for i, (name, skill) in enumerate(entries[j:])]
+        if deleted:
+            self.conn.executemany(f"DELETE FROM {table} WHERE day = ? AND seq = ?", deleted)
+        if added:
+            self.conn.executemany(f"INSERT INTO {table} (day, seq, name, skill) VALUES (?, ?, ?, ?)", added)
+        self._rows[(day, key)] = kept + [row[1:] for row in added]
+
+    def _read_courts(self):
+        settings = self.conn.execute("SELECT key, value FROM court_settings").fetchall()
+        rows = self.conn.execute("SELECT data FROM courts ORDER BY seq").fetchall()
+        if not settings and not rows:
+            return None
+        courts = {key: json.loads(value) for key, value in settings}
+        courts["courts"] = [json.loads(data) for (data,) in rows]
+        return courts
+
+    def _write_courts(self, courts):
+        conn = self.conn
+        conn.execute("DELETE FROM courts")
+        conn.executemany(
+            "INSERT INTO courts (seq, court_id, name, level, row, col, active, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(seq, c.get("id"), c.get("name"), c.get("level"),
+              c.get("position", {}).get("row"), c.get("position", {}).get("col"),
+              int(bool(c.get("active", True))), json.dumps(c))
+             for seq, c in enumerate(courts.get("courts", []))])
+        conn.execute("DELETE FROM court_settings")
+        conn.executemany("INSERT INTO court_settings (key, value) VALUES (?, ?)",
+                         [(k, json.dumps(v)) for k, v in courts.items() if k != "courts"])
+
+
+class SqliteAuditLog:
+    """Audit trail stored in the SQLite `audit` table, one row per entry"""
+
+    _COLUMNS = ("action", "details", "user_type", "timestamp")
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = connect_sqlite(self.path)
+        return self._conn
+
+    def append(self, entry):
+        """Insert a single entry"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO audit (action, details, user_type, timestamp) VALUES (?, ?, ?, ?)",
+                tuple(entry.get(c) for c in self._COLUMNS))
+
+    def sync(self):
+        """Entries are committed as they are appended"""
+
+    def entries(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT action, details, user_type, timestamp FROM audit ORDER BY id").fetchall()
+        return [dict(zip(self._COLUMNS, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# JSON import/export for the SQLite backend
+def import_json_files(conn, players_path=PLAYERS_FILE, courts_path=COURTS_FILE,
+                      audit_path=AUDIT_LOG_FILE, legacy_audit_path=AUDIT_FILE):
+    """Copy the JSON data files into the SQLite database behind `conn`.
+
+    Runs in the caller's open transaction; the caller commits.
+    """
+    backend = SqliteBackend()
+    backend._conn = conn
+    source = JsonBackend()
+    players, _ = source.read(players_path)
+    if players is not None:
+        backend._write_players(players)
+    courts, _ = source.read(courts_path)
+    if courts is not None:
+        backend._write_courts(courts)
+    migrate_audit_trail(legacy_audit_path, audit_path)
+    entries = AuditLog(audit_path).entries()
+    conn.executemany(
+        "INSERT INTO audit (action, details, user_type, timestamp) VALUES (?, ?, ?, ?)",
+        [tuple(e.get(c) for c in SqliteAuditLog._COLUMNS) for e in entries])
+
+
+def export_json_files(db_path=SQLITE_FILE, players_path=PLAYERS_FILE, courts_path=COURTS_FILE,
+                      audit_path=AUDIT_LOG_FILE):
+    """Write the SQLite database back out as the JSON data files"""
+    backend = SqliteBackend(db_path)
+    target = JsonBackend()
+    players, _ = backend.read(PLAYERS_FILE)
+    if players is not None:
+        target.write(players_path, players)
+    courts, _ = backend.read(COURTS_FILE)
+    if courts is not None:
+        target.write(courts_path, courts)
+    with open(audit_path, "w") as f:
+        for entry in SqliteAuditLog(db_path).entries():
+            f.write(json.dumps(entry) + "\n")
+
+
+if __name__ == "__main__":
+    # python storage.py import|export
+    if len(sys.argv) != 2 or sys.argv[1] not in ("import", "export"):
+        sys.exit("usage: python storage.py import|export")
+    if sys.argv[1] == "import":
+        if os.path.exists(SQLITE_FILE):
+            sys.exit(f"{SQLITE_FILE} already exists; remove it to re-import the JSON files")
+        connect_sqlite(SQLITE_FILE).close()
+    else:
+        export_json_files()
+    print(f"{sys.argv[1].title()}ed {SQLITE_FILE}")
@@ -1,7 +1,11 @@
 import streamlit as st
+import html
 import json
 from datetime import datetime
 import pandas as pd
+from roster import Roster, day_capacity, roster_html, SKILL_LEVELS, PLAYERS, WAITLIST, CAPACITY
+from scheduling import assign_courts, balance_courts, court_html, rotation_schedule, rotation_stats
+from storage import DataStore, add_audit_log, get_audit_log, JSON_CACHE_STATS, PLAYERS_FILE, COURTS_FILE
 
 # Configuration
 st.set_page_config(page_title="Team Baddies", page_icon="🏸", layout="wide")
@@ -10,62 +14,43 @@ ADMIN_PASSWORD = "admin123"
 # Initialize session state
 if 'admin_logged_in' not in st.session_state:
     st.session_state.admin_logged_in = False
+if 'data_store' not in st.session_state:
+    st.session_state.data_store = DataStore()
 
 # Data Management Functions
 def load_data():
     """Load all application data"""
-    try:
-        with open("player_list.json", "r") as f:
-            players = json.load(f)
-    except FileNotFoundError:
-        players = {
-            "Monday": {"Players": [], "Waitlist": []},
-            "Tuesday": {"Players": [], "Waitlist": []},
-            "Thursday": {"Players": [], "Waitlist": []}
-        }
+    store = st.session_state.data_store
+    players = store.load(PLAYERS_FILE, {
+        "Monday": {"Players": [], "Waitlist": []},
+        "Tuesday": {"Players": [], "Waitlist": []},
+        "Thursday": {"Players": [], "Waitlist": []}
+    })
     
-    try:
-        with open("court_layout.json", "r") as f:
-            courts = json.load(f)
-    except FileNotFoundError:
-        courts = {
-            "courts": [
-                {"id": 1, "level": "beginner", "name": "Court 1", "position": {"row": 0, "col": 0}, "active": True},
-                {"id": 2, "level": "beginner", "name": "Court 2", "position": {"row": 0, "col": 1}, "active": True},
-                {"id": 3, "level": "intermediate", "name": "Court 3", "position": {"row": 1, "col": 0}, "active": True},
-                {"id": 4, "level": "intermediate", "name": "Court 4", "position": {"row": 1, "col": 1}, "active": True},
-                {"id": 5, "level": "advanced", "name": "Court 5", "position": {"row": 2, "col": 0}, "active": True},
-                {"id": 6, "level": "advanced", "name": "Court 6", "position": {"row": 2, "col": 1}, "active": True}
-            ],
-            "layout_settings": {
-                "rows": 3, "cols": 4, "center_name": "Team Baddies Badminton Center",
-                "total_courts": 6
-            }
+    courts = store.load(COURTS_FILE, {
+        "courts": [
+            {"id": 1, "level": "beginner", "name": "Court 1", "position": {"row": 0, "col": 0}, "active": True},
+            {"id": 2, "level": "beginner", "name": "Court 2", "position": {"row": 0, "col": 1}, "active": True},
+            {"id": 3, "level": "intermediate", "name": "Court 3", "position": {"row": 1, "col": 0}, "active": True},
+            {"id": 4, "level": "intermediate", "name": "Court 4", "position": {"row": 1, "col": 1}, "active": True},
+            {"id": 5, "level": "advanced", "name": "Court 5", "position": {"row": 2, "col": 0}, "active": True},
+            {"id": 6, "level": "advanced", "name": "Court 6", "position": {"row": 2, "col": 1}, "active": True}
+        ],
+        "layout_settings": {
+            "rows": 3, "cols": 4, "center_name": "Team Baddies Badminton Center",
+            "total_courts": 6
         }
+    })
     
-    try:
-        with open("audit_trail.json", "r") as f:
-            audit = json.load(f)
-    except FileNotFoundError:
-        audit = []
+    audit = get_audit_log()
     
     return players, courts, audit
 
 def save_data(players, courts, audit):
-    """Save all application data"""
-    with open("player_list.json", "w") as f:
-        json.dump(players, f, indent=2)
-    with open("court_layout.json", "w") as f:
-        json.dump(courts, f, indent=2)
-    with open("audit_trail.json", "w") as f:
-        json.dump(audit, f, indent=2)
-
-def add_audit_log(audit, action, details, user_type="user"):
-    """Add entry to audit trail"""
-    audit.append({
-        "action": action, "details": details, "user_type": user_type,
-        "timestamp": datetime.now().isoformat()
-    })
+    """Save the data files that changed during this run (the audit log is append-only)"""
+    store = st.session_state.data_store
+    store.save(PLAYERS_FILE, players)
+    store.save(COURTS_FILE, courts)
 
 # Court Image Generation
 # NOTE: Court layout and image export functionality removed per request.
@@ -113,94 +98,131 @@ def sidebar_navigation():
     
     return page, day
 
+def remove_from_roster(players, day, roster, names, list_label, audit, courts):
+    """Remove a batch of players, promote from the waitlist and persist once"""
+    removed, promoted = roster.remove_many(names)
+    players[day].update(roster.to_dict())
+    # Saved before logging, so the audit trail never records a change that was not stored
+    save_data(players, courts, audit)
+    for entry in removed:
+        add_audit_log(audit, "Removed", f"{entry.name} from {day} {list_label}")
+    for entry in promoted:
+        add_audit_log(audit, "Promoted", f"{entry.name} from {day} waitlist to player list")
+    return promoted
+
 def render_player_management(players, day, audit, courts):
     """Render player management section"""
+    roster = Roster.from_dict(players[day])
     col1, col2 = st.columns([3, 2])
     
     with col1:
-        st.markdown("<div class='card'><h3>Players for {}</h3>".format(day), unsafe_allow_html=True)
-        
-        player_list = players[day]["Players"]
-        waitlist = players[day]["Waitlist"]
+        # The whole list area is a handful of elements however many players there are
+        players_html, waitlist_html = roster_html(roster.version)
         
-        if player_list:
-            st.markdown("**Active Players:**")
-            for i, (name, skill) in enumerate(player_list, 1):
-                st.markdown(f"""
-                <div style='display: flex; justify-content: space-between; align-items: center; 
-                           padding: 0.5rem; margin: 0.25rem 0; background: #f8f9fa; border-radius: 5px;'>
-                    <span><strong>{i}.</strong> {name}</span>
-                    <span class='skill-{skill.lower()}'>{skill}</span>
-                </div>""", unsafe_allow_html=True)
-        else:
+        st.markdown(f"<div class='card'><h3>Players for {html.escape(day)}</h3>{players_html}</div>", unsafe_allow_html=True)
+        if not players_html:
             st.info("No players added yet.")
         
-        st.markdown(f"<p style='color: #28a745; font-weight: bold;'>Player Count: {len(player_list)}/27</p>", unsafe_allow_html=True)
-        
-        st.markdown("<h3>Waitlist</h3>", unsafe_allow_html=True)
-        if waitlist:
-            for i, (name, skill) in enumerate(waitlist, 1):
-                st.markdown(f"""
-                <div style='display: flex; justify-content: space-between; align-items: center; 
-                           padding: 0.5rem; margin: 0.25rem 0; background: #fff3cd; border-radius: 5px;'>
-                    <span><strong>{i}.</strong> {name}</span>
-                    <span class='skill-{skill.lower()}'>{skill}</span>
-                </div>""", unsafe_allow_html=True)
-        else:
+        st.markdown(f"<p style='color: #28a745; font-weight: bold;'>Player Count: {roster.player_count}/{roster.capacity}</p>"
+                    f"<h3>Waitlist</h3>{waitlist_html}", unsafe_allow_html=True)
+        if not waitlist_html:
             st.info("No players in waitlist.")
         
-        st.markdown(f"<p style='color: #fd7e14; font-weight: bold;'>Waitlist Count: {len(waitlist)}/20</p></div>", unsafe_allow_html=True)
+        st.markdown(f"<p style='color: #fd7e14; font-weight: bold;'>Waitlist Count: {roster.waitlist_count}/{roster.waitlist_capacity}</p>", unsafe_allow_html=True)
+        
+        if st.session_state.admin_logged_in and roster.duplicate_names:
+            st.warning(f"Signed up more than once: {', '.join(roster.duplicate_names)}. Remove the extra entries if they are the same person.")
     
     with col2:
         st.markdown("<div class='card'><h3>Add Player</h3>", unsafe_allow_html=True)
         
         new_player = st.text_input("Name:", key=f"new_player_{day}")
-        skill_level = st.selectbox("Skill Level:", ["Beginner", "Intermediate", "Advanced"], key=f"skill_{day}")
+        skill_level = st.selectbox("Skill Level:", SKILL_LEVELS, key=f"skill_{day}")
         
         if st.button("Add Player", use_container_width=True, key=f"add_{day}"):
-            if new_player:
-                if len(player_list) < 27:
-                    player_list.append([new_player, skill_level])
-                    st.success(f"{new_player} added to {day} player list!")
-                elif len(waitlist) < 20:
-                    waitlist.append([new_player, skill_level])
-                    st.success(f"{new_player} added to {day} waitlist!")
-                else:
-                    st.error(f"Sorry, both lists are full for {day}.")
-                add_audit_log(audit, "Added", f"{new_player} ({skill_level}) - {day}")
-                # Persist immediately
-                save_data(players, courts, audit)
-                st.rerun()
+            try:
+                added_to = roster.add(new_player, skill_level)
+            except ValueError as e:
+                st.error(str(e))
             else:
-                st.error("Please enter a name.")
+                if added_to is None:
+                    st.error(f"Sorry, both lists are full for {day}.")
+                else:
+                    players[day].update(roster.to_dict())
+                    st.success(f"{new_player} added to {day} {'player list' if added_to == PLAYERS else 'waitlist'}!")
+                    # Persist immediately, before logging
+                    save_data(players, courts, audit)
+                    add_audit_log(audit, "Added", f"{new_player} ({skill_level}) - {day}")
+                    st.rerun()
         
         st.markdown("<h3>Remove Player</h3>", unsafe_allow_html=True)
         
-        # Remove from player list
-        if player_list:
-            remove_player = st.selectbox("From player list:", ["None"] + [p[0] for p in player_list], key=f"remove_player_{day}")
-            if remove_player != "None" and st.button("Remove from List", key=f"remove_list_{day}"):
-                player_data = next(p for p in player_list if p[0] == remove_player)
-                player_list.remove(player_data)
-                add_audit_log(audit, "Removed", f"{remove_player} from {day} list")
-                # Persist immediately
-                save_data(players, courts, audit)
-                st.success(f"Removed {remove_player}")
+        # Remove from player list; freed places are filled from the waitlist
+        if roster.player_count:
+            remove_players = st.multiselect("From player list:", [e.name for e in roster.players], key=f"remove_player_{day}")
+            if remove_players and st.button("Remove from List", key=f"remove_list_{day}"):
+                promoted = remove_from_roster(players, day, roster, remove_players, "list", audit, courts)
+                st.success(f"Removed {', '.join(remove_players)}")
+                if promoted:
+                    st.success(f"Promoted {', '.join(e.name for e in promoted)} from the waitlist")
                 st.rerun()
         
         # Remove from waitlist
-        if waitlist:
-            remove_waitlist = st.selectbox("From waitlist:", ["None"] + [p[0] for p in waitlist], key=f"remove_wait_{day}")
-            if remove_waitlist != "None" and st.button("Remove from Waitlist", key=f"remove_wait_btn_{day}"):
-                player_data = next(p for p in waitlist if p[0] == remove_waitlist)
-                waitlist.remove(player_data)
-                add_audit_log(audit, "Removed", f"{remove_waitlist} from {day} waitlist")
-                save_data(players, courts, audit)
-                st.success(f"Removed {remove_waitlist}")
+        if roster.waitlist_count:
+            remove_waitlist = st.multiselect("From waitlist:", [e.name for e in roster.waitlist], key=f"remove_wait_{day}")
+            if remove_waitlist and st.button("Remove from Waitlist", key=f"remove_wait_btn_{day}"):
+                remove_from_roster(players, day, roster, remove_waitlist, "waitlist", audit, courts)
+                st.success(f"Removed {', '.join(remove_waitlist)}")
                 st.rerun()
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+def render_court_assignments(players, day, courts):
+    """Render the day's players placed on the active courts by skill level, in evenly matched sides"""
+    assignments, sitting_out = assign_courts(players[day].get(PLAYERS, []), courts.get("courts", []))
+    if not assignments:
+        st.info("No active courts to assign players to.")
+        return
+    
+    for assignment, (sides, gap) in zip(assignments, balance_courts([a["players"] for a in assignments])):
+        assignment["sides"], assignment["gap"] = sides, gap
+    for start in range(0, len(assignments), 3):
+        for col, assignment in zip(st.columns(3), assignments[start:start + 3]):
+            col.markdown(court_html(assignment), unsafe_allow_html=True)
+    
+    if sitting_out:
+        names = ", ".join(html.escape(name) for name, _ in sitting_out)
+        st.markdown(f"<p style='color: #fd7e14; font-weight: bold;'>Sitting out ({len(sitting_out)}): {names}</p>", unsafe_allow_html=True)
+
+def render_rotation_schedule(players, day, courts):
+    """Render a schedule of rounds for the day, one row per round"""
+    day_players = players[day].get(PLAYERS, [])
+    if not day_players:
+        st.info("Add players to plan the rotation.")
+        return
+    
+    rounds = st.number_input("Rounds:", min_value=1, max_value=30, value=6, key=f"rounds_{day}")
+    # Cached on the roster, the courts and the rounds, so reruns don't plan again
+    players_version, _ = Roster.from_dict(players[day]).version
+    schedule = rotation_schedule(players_version, json.dumps(courts.get("courts", []), sort_keys=True), int(rounds))
+    
+    def side_names(side):
+        return " & ".join(name for name, _ in side)
+    
+    rows = []
+    for number, round_ in enumerate(schedule, 1):
+        row = {"Round": number}
+        for court in round_["courts"]:
+            row[court["court"].get("name", "")] = " vs ".join(side_names(side) for side in court["sides"] if side)
+        row["Sitting Out"] = side_names(round_["sitting_out"])
+        rows.append(row)
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    
+    stats = rotation_stats(schedule)
+    sat_out = [stats["sat_out"][name] for name, _ in day_players]
+    st.caption(f"Sit-outs per player: {min(sat_out)}–{max(sat_out)} · "
+               f"Repeated partners: {stats['repeated_partners']} · Repeated opponents: {stats['repeated_opponents']}")
+
 def render_court_layout_page(courts, audit):
     # NOTE: Court layout functionality removed — use the Admin Panel for player/court data management via JSON files.
     st.warning("Court Layout functionality has been removed from this app. You can still manage players and data in the Admin Panel.")
@@ -223,10 +245,46 @@ def render_admin_panel(players, courts, audit):
     col2.metric("Total Waitlisted", total_waitlist)
     col3.metric("Total Courts", total_courts)
     
+    # Persistence statistics for this session
+    write_stats = st.session_state.data_store.stats
+    col1, col2, col3 = st.columns(3)
+    col1.metric("File Writes", write_stats["writes"])
+    col2.metric("Writes Avoided", write_stats["skipped"])
+    col3.metric("Cached Loads", JSON_CACHE_STATS["hits"])
+    
+    # Session capacity per day
+    st.markdown("### Session Capacity")
+    with st.form("capacity_form"):
+        capacity_cols = st.columns(len(players))
+        new_capacity = {}
+        for col, day in zip(capacity_cols, players):
+            player_cap, waitlist_cap = day_capacity(players[day])
+            col.markdown(f"**{day}**")
+            new_capacity[day] = (
+                col.number_input("Players", min_value=0, max_value=200, value=player_cap, key=f"cap_players_{day}"),
+                col.number_input("Waitlist", min_value=0, max_value=200, value=waitlist_cap, key=f"cap_wait_{day}"),
+            )
+        if st.form_submit_button("💾 Save Capacity"):
+            changes = []
+            for day, (player_cap, waitlist_cap) in new_capacity.items():
+                if (player_cap, waitlist_cap) == day_capacity(players[day]):
+                    continue
+                roster = Roster.from_dict(players[day])
+                promoted = roster.set_capacity(player_cap, waitlist_cap)
+                players[day].update(roster.to_dict())
+                players[day][CAPACITY] = {PLAYERS: player_cap, WAITLIST: waitlist_cap}
+                changes.append(("Updated Capacity", f"{day}: {player_cap} players, {waitlist_cap} waitlist"))
+                changes.extend(("Promoted", f"{entry.name} from {day} waitlist to player list") for entry in promoted)
+            save_data(players, courts, audit)
+            for action, details in changes:
+                add_audit_log(audit, action, details, "admin")
+            st.rerun()
+    
     # Audit trail
     st.markdown("### Audit Trail")
-    if audit:
-        audit_df = pd.DataFrame(audit)
+    audit_entries = audit.entries()
+    if audit_entries:
+        audit_df = pd.DataFrame(audit_entries)
         st.dataframe(audit_df, use_container_width=True)
         
         # Export option
@@ -268,6 +326,13 @@ def main():
         # Player management
         st.markdown("### 👥 Player Registration")
         render_player_management(players, day, audit, courts)
+        
+        st.markdown("---")
+        st.markdown(f"### 🏸 Court Assignments for {day}")
+        render_court_assignments(players, day, courts)
+        
+        st.markdown(f"### 🔄 Rotation Schedule for {day}")
+        render_rotation_schedule(players, day, courts)
     
     # The 'Court Layout' page has been removed from the UI.
     
@@ -2,9 +2,15 @@ import streamlit as st
 import json
 from datetime import datetime
 import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
-import io
-import platform
+from court_layout import CourtLayout
+from court_render import (get_court_image, get_court_image_bytes, get_court_svg, get_preview_bytes,
+                          lazy_court_image_bytes, font_source, benchmark_encodings, benchmark_backends,
+                          DEFAULT_PREVIEW_SCALE, DEFAULT_RENDER_BACKEND, DOWNLOAD_FORMATS, RENDER_BACKENDS,
+                          RENDER_CACHE_STATS, TEXT_METRICS_STATS, hidden_courts, hit_rate)
+from export_layouts import save_layout_snapshot
+from roster import Roster, SKILL_LEVELS, PLAYERS
+from new_court_layout import render_auto_fill, render_court_grid_editor, save_layout
+from storage import DataStore, add_audit_log, get_audit_log, JSON_CACHE_STATS, PLAYERS_FILE, COURTS_FILE
 
 # Configuration
 st.set_page_config(page_title="Team Baddies", page_icon="🏸", layout="wide")
@@ -13,184 +19,43 @@ ADMIN_PASSWORD = "admin123"
 # Initialize session state
 if 'admin_logged_in' not in st.session_state:
     st.session_state.admin_logged_in = False
+if 'data_store' not in st.session_state:
+    st.session_state.data_store = DataStore()
 
 # Data Management Functions
 def load_data():
     """Load all application data"""
-    try:
-        with open("player_list.json", "r") as f:
-            players = json.load(f)
-    except FileNotFoundError:
-        players = {
-            "Monday": {"Players": [], "Waitlist": []},
-            "Tuesday": {"Players": [], "Waitlist": []},
-            "Thursday": {"Players": [], "Waitlist": []}
-        }
+    store = st.session_state.data_store
+    players = store.load(PLAYERS_FILE, {
+        "Monday": {"Players": [], "Waitlist": []},
+        "Tuesday": {"Players": [], "Waitlist": []},
+        "Thursday": {"Players": [], "Waitlist": []}
+    })
     
-    try:
-        with open("court_layout.json", "r") as f:
-            courts = json.load(f)
-    except FileNotFoundError:
-        courts = {
-            "courts": [
-                {"id": 1, "level": "beginner", "name": "Court 1", "position": {"row": 0, "col": 0}, "active": True},
-                {"id": 2, "level": "beginner", "name": "Court 2", "position": {"row": 0, "col": 1}, "active": True},
-                {"id": 3, "level": "intermediate", "name": "Court 3", "position": {"row": 1, "col": 0}, "active": True},
-                {"id": 4, "level": "intermediate", "name": "Court 4", "position": {"row": 1, "col": 1}, "active": True},
-                {"id": 5, "level": "advanced", "name": "Court 5", "position": {"row": 2, "col": 0}, "active": True},
-                {"id": 6, "level": "advanced", "name": "Court 6", "position": {"row": 2, "col": 1}, "active": True}
-            ],
-            "layout_settings": {
-                "rows": 3, "cols": 4, "center_name": "Team Baddies Badminton Center",
-                "total_courts": 6
-            }
+    courts = store.load(COURTS_FILE, {
+        "courts": [
+            {"id": 1, "level": "beginner", "name": "Court 1", "position": {"row": 0, "col": 0}, "active": True},
+            {"id": 2, "level": "beginner", "name": "Court 2", "position": {"row": 0, "col": 1}, "active": True},
+            {"id": 3, "level": "intermediate", "name": "Court 3", "position": {"row": 1, "col": 0}, "active": True},
+            {"id": 4, "level": "intermediate", "name": "Court 4", "position": {"row": 1, "col": 1}, "active": True},
+            {"id": 5, "level": "advanced", "name": "Court 5", "position": {"row": 2, "col": 0}, "active": True},
+            {"id": 6, "level": "advanced", "name": "Court 6", "position": {"row": 2, "col": 1}, "active": True}
+        ],
+        "layout_settings": {
+            "rows": 3, "cols": 4, "center_name": "Team Baddies Badminton Center",
+            "total_courts": 6
         }
+    })
     
-    try:
-        with open("audit_trail.json", "r") as f:
-            audit = json.load(f)
-    except FileNotFoundError:
-        audit = []
+    audit = get_audit_log()
     
     return players, courts, audit
 
 def save_data(players, courts, audit):
-    """Save all application data"""
-    with open("player_list.json", "w") as f:
-        json.dump(players, f, indent=2)
-    with open("court_layout.json", "w") as f:
-        json.dump(courts, f, indent=2)
-    with open("audit_trail.json", "w") as f:
-        json.dump(audit, f, indent=2)
-
-def add_audit_log(audit, action, details, user_type="user"):
-    """Add entry to audit trail"""
-    audit.append({
-        "action": action, "details": details, "user_type": user_type,
-        "timestamp": datetime.now().isoformat()
-    })
-
-# Court Image Generation
-def generate_court_image(courts, settings):
-    """Generate court layout image"""
-    width, height = 1200, 800
-    colors = {
-        'beginner': '#28a745', 'intermediate': '#fd7e14', 'advanced': '#dc3545',
-        'background': '#f8f9fa', 'border': '#343a40', 'text': '#ffffff'
-    }
-    
-    img = Image.new('RGB', (width, height), colors['background'])
-    draw = ImageDraw.Draw(img)
-    
-    # Load fonts with fallback
-    try:
-        if platform.system() == "Windows":
-            font_lg = ImageFont.truetype("arial.ttf", 28)
-            font_md = ImageFont.truetype("arial.ttf", 20)
-            font_sm = ImageFont.truetype("arial.ttf", 16)
-        else:
-            font_lg = ImageFont.truetype("DejaVuSans.ttf", 28)
-            font_md = ImageFont.truetype("DejaVuSans.ttf", 20)
-            font_sm = ImageFont.truetype("DejaVuSans.ttf", 16)
-    except:
-        font_lg = font_md = font_sm = None
-    
-    # Draw title
-    title = settings.get('center_name', 'Team Baddies Badminton Center')
-    try:
-        if font_lg:
-            bbox = draw.textbbox((0, 0), title, font=font_lg)
-            x = (width - (bbox[2] - bbox[0])) // 2
-            draw.text((x, 15), title, fill=colors['border'], font=font_lg)
-        else:
-            draw.text((width//2 - len(title)*6, 15), title, fill=colors['border'])
-    except:
-        draw.text((50, 15), title, fill=colors['border'])
-    
-    # Court layout - more compact spacing
-    rows, cols = settings.get('rows', 3), settings.get('cols', 4)
-    court_w, court_h = 160, 100
-    spacing_x, spacing_y = 15, 15  # Reduced spacing
-    margin_x = (width - (cols * court_w + (cols-1) * spacing_x)) // 2
-    margin_y = 70  # Reduced top margin
-    
-    active_courts = [c for c in courts if c.get("active", True)]
-    court_positions = {(c.get('position', {}).get('row', 0), c.get('position', {}).get('col', 0)): c 
-                      for c in active_courts}
-    
-    # Draw courts
-    for row in range(rows):
-        for col in range(cols):
-            x = margin_x + col * (court_w + spacing_x)
-            y = margin_y + row * (court_h + spacing_y)
-            
-            if (row, col) in court_positions:
-                court = court_positions[(row, col)]
-                color = colors[court['level']]
-                
-                # Draw clean court rectangle (no lines inside)
-                draw.rectangle([x, y, x + court_w, y + court_h], fill=color, outline=colors['border'], width=2)
-                
-                # Draw compact centered text
-                name = court.get('name', f'Court {court.get("id", 1)}')
-                level = court.get('level', 'beginner').title()
-                
-                try:
-                    if font_md and font_sm:
-                        # Center the text more compactly
-                        name_bbox = draw.textbbox((0, 0), name, font=font_md)
-                        level_bbox = draw.textbbox((0, 0), level, font=font_sm)
-                        
-                        name_x = x + (court_w - (name_bbox[2] - name_bbox[0])) // 2
-                        level_x = x + (court_w - (level_bbox[2] - level_bbox[0])) // 2
-                        
-                        # More compact vertical spacing
-                        draw.text((name_x, y + 30), name, fill=colors['text'], font=font_md)
-                        draw.text((level_x, y + 55), level, fill=colors['text'], font=font_sm)
-                    else:
-                        # Fallback with more compact positioning
-                        draw.text((x + court_w//2 - len(name)*4, y + 30), name, fill=colors['text'])
-                        draw.text((x + court_w//2 - len(level)*3, y + 55), level, fill=colors['text'])
-                except:
-                    draw.text((x + court_w//2 - len(name)*4, y + 35), name, fill=colors['text'])
-                    draw.text((x + court_w//2 - len(level)*3, y + 55), level, fill=colors['text'])
-            else:
-                # Empty space
-                draw.rectangle([x, y, x + court_w, y + court_h], fill='#e9ecef', outline='#adb5bd', width=1)
-                if settings.get('admin_mode'):
-                    # Plus icon for empty slots
-                    draw.line([x + court_w//2 - 15, y + court_h//2, x + court_w//2 + 15, y + court_h//2], fill='#6c757d', width=2)
-                    draw.line([x + court_w//2, y + court_h//2 - 15, x + court_w//2, y + court_h//2 + 15], fill='#6c757d', width=2)
-    
-    # Compact legend
-    legend_y = height - 100  # Moved up for more compact layout
-    legend_items = [('Beginner', colors['beginner']), ('Intermediate', colors['intermediate']), ('Advanced', colors['advanced'])]
-    
-    for i, (level, color) in enumerate(legend_items):
-        x = 80 + i * 160  # More compact spacing
-        draw.rectangle([x, legend_y, x + 25, legend_y + 18], fill=color, outline=colors['border'], width=1)
-        try:
-            if font_sm:
-                draw.text((x + 35, legend_y + 2), level, fill=colors['border'], font=font_sm)
-            else:
-                draw.text((x + 35, legend_y + 2), level, fill=colors['border'])
-        except:
-            draw.text((x + 35, legend_y + 2), level, fill=colors['border'])
-    
-    # Compact statistics
-    stats = f"Total: {len(active_courts)} | " + " | ".join([f"{level.title()}: {len([c for c in active_courts if c.get('level') == level])}" 
-                                                           for level in ['beginner', 'intermediate', 'advanced']])
-    try:
-        if font_sm:
-            bbox = draw.textbbox((0, 0), stats, font=font_sm)
-            x = (width - (bbox[2] - bbox[0])) // 2
-            draw.text((x, legend_y + 30), stats, fill=colors['border'], font=font_sm)
-        else:
-            draw.text((width//2 - len(stats)*4, legend_y + 30), stats, fill=colors['border'])
-    except:
-        draw.text((50, legend_y + 30), stats, fill=colors['border'])
-    
-    return img
+    """Save the data files that changed during this run (the audit log is append-only)"""
+    store = st.session_state.data_store
+    store.save(PLAYERS_FILE, players)
+    store.save(COURTS_FILE, courts)
 
 # UI Components
 def render_css():
@@ -235,90 +100,98 @@ def sidebar_navigation():
     
     return page, day
 
-def render_player_management(players, day, audit):
+def remove_from_roster(players, day, roster, name, list_label, audit, courts):
+    """Remove one player, promote from the waitlist and persist before logging"""
+    removed, promoted = roster.remove_many([name])
+    players[day].update(roster.to_dict())
+    save_data(players, courts, audit)
+    for entry in removed:
+        add_audit_log(audit, "Removed", f"{entry.name} from {day} {list_label}")
+    for entry in promoted:
+        add_audit_log(audit, "Promoted", f"{entry.name} from {day} waitlist to player list")
+    return promoted
+
+def render_player_management(players, day, audit, courts):
     """Render player management section"""
+    roster = Roster.from_dict(players[day])
     col1, col2 = st.columns([3, 2])
     
     with col1:
         st.markdown("<div class='card'><h3>Players for {}</h3>".format(day), unsafe_allow_html=True)
         
-        player_list = players[day]["Players"]
-        waitlist = players[day]["Waitlist"]
-        
-        if player_list:
+        if roster.player_count:
             st.markdown("**Active Players:**")
-            for i, (name, skill) in enumerate(player_list, 1):
+            for i, entry in enumerate(roster.players, 1):
                 st.markdown(f"""
                 <div style='display: flex; justify-content: space-between; align-items: center; 
                            padding: 0.5rem; margin: 0.25rem 0; background: #f8f9fa; border-radius: 5px;'>
-                    <span><strong>{i}.</strong> {name}</span>
-                    <span class='skill-{skill.lower()}'>{skill}</span>
+                    <span><strong>{i}.</strong> {entry.name}</span>
+                    <span class='skill-{entry.skill.lower()}'>{entry.skill}</span>
                 </div>""", unsafe_allow_html=True)
         else:
             st.info("No players added yet.")
         
-        st.markdown(f"<p style='color: #28a745; font-weight: bold;'>Player Count: {len(player_list)}/27</p>", unsafe_allow_html=True)
+        st.markdown(f"<p style='color: #28a745; font-weight: bold;'>Player Count: {roster.player_count}/{roster.capacity}</p>", unsafe_allow_html=True)
         
         st.markdown("<h3>Waitlist</h3>", unsafe_allow_html=True)
-        if waitlist:
-            for i, (name, skill) in enumerate(waitlist, 1):
+        if roster.waitlist_count:
+            for i, entry in enumerate(roster.waitlist, 1):
                 st.markdown(f"""
                 <div style='display: flex; justify-content: space-between; align-items: center; 
                            padding: 0.5rem; margin: 0.25rem 0; background: #fff3cd; border-radius: 5px;'>
-                    <span><strong>{i}.</strong> {name}</span>
-                    <span class='skill-{skill.lower()}'>{skill}</span>
+                    <span><strong>{i}.</strong> {entry.name}</span>
+                    <span class='skill-{entry.skill.lower()}'>{entry.skill}</span>
                 </div>""", unsafe_allow_html=True)
         else:
             st.info("No players in waitlist.")
         
-        st.markdown(f"<p style='color: #fd7e14; font-weight: bold;'>Waitlist Count: {len(waitlist)}/20</p></div>", unsafe_allow_html=True)
+        st.markdown(f"<p style='color: #fd7e14; font-weight: bold;'>Waitlist Count: {roster.waitlist_count}/{roster.waitlist_capacity}</p></div>", unsafe_allow_html=True)
     
     with col2:
         st.markdown("<div class='card'><h3>Add Player</h3>", unsafe_allow_html=True)
         
         new_player = st.text_input("Name:")
-        skill_level = st.selectbox("Skill Level:", ["Beginner", "Intermediate", "Advanced"])
+        skill_level = st.selectbox("Skill Level:", SKILL_LEVELS)
         
         if st.button("Add Player", use_container_width=True):
-            if new_player:
-                if len(player_list) < 27:
-                    player_list.append([new_player, skill_level])
-                    st.success(f"{new_player} added to {day} player list!")
-                elif len(waitlist) < 20:
-                    waitlist.append([new_player, skill_level])
-                    st.success(f"{new_player} added to {day} waitlist!")
-                else:
-                    st.error(f"Sorry, both lists are full for {day}.")
-                add_audit_log(audit, "Added", f"{new_player} ({skill_level}) - {day}")
-                st.rerun()
+            try:
+                added_to = roster.add(new_player, skill_level)
+            except ValueError as e:
+                st.error(str(e))
             else:
-                st.error("Please enter a name.")
+                if added_to is None:
+                    st.error(f"Sorry, both lists are full for {day}.")
+                else:
+                    players[day].update(roster.to_dict())
+                    st.success(f"{new_player} added to {day} {'player list' if added_to == PLAYERS else 'waitlist'}!")
+                    # Persist before logging and rerunning; st.rerun() skips the save at the end of main()
+                    save_data(players, courts, audit)
+                    add_audit_log(audit, "Added", f"{new_player} ({skill_level}) - {day}")
+                    st.rerun()
         
         st.markdown("<h3>Remove Player</h3>", unsafe_allow_html=True)
         
-        # Remove from player list
-        if player_list:
-            remove_player = st.selectbox("From player list:", ["None"] + [p[0] for p in player_list])
+        # Remove from player list; the freed place is filled from the waitlist
+        if roster.player_count:
+            remove_player = st.selectbox("From player list:", ["None"] + [e.name for e in roster.players])
             if remove_player != "None" and st.button("Remove from List"):
-                player_data = next(p for p in player_list if p[0] == remove_player)
-                player_list.remove(player_data)
-                add_audit_log(audit, "Removed", f"{remove_player} from {day} list")
+                promoted = remove_from_roster(players, day, roster, remove_player, "list", audit, courts)
                 st.success(f"Removed {remove_player}")
+                if promoted:
+                    st.success(f"Promoted {', '.join(e.name for e in promoted)} from the waitlist")
                 st.rerun()
         
         # Remove from waitlist
-        if waitlist:
-            remove_waitlist = st.selectbox("From waitlist:", ["None"] + [p[0] for p in waitlist])
+        if roster.waitlist_count:
+            remove_waitlist = st.selectbox("From waitlist:", ["None"] + [e.name for e in roster.waitlist])
             if remove_waitlist != "None" and st.button("Remove from Waitlist"):
-                player_data = next(p for p in waitlist if p[0] == remove_waitlist)
-                waitlist.remove(player_data)
-                add_audit_log(audit, "Removed", f"{remove_waitlist} from {day} waitlist")
+                remove_from_roster(players, day, roster, remove_waitlist, "waitlist", audit, courts)
                 st.success(f"Removed {remove_waitlist}")
                 st.rerun()
         
         st.markdown("</div>", unsafe_allow_html=True)
 
-def render_court_layout_page(courts, audit):
+def render_court_layout_page(players, courts, audit):
     """Render court layout management page"""
     if not st.session_state.admin_logged_in:
         st.warning("🔒 Please log in as admin to access court layout settings.")
@@ -354,7 +227,9 @@ def render_court_layout_page(courts, audit):
     
     with col3:
         if st.button("🔄 Reset All Courts", help="This will clear all court configurations"):
-            courts["courts"] = []
+            layout = CourtLayout.from_dict(courts)
+            layout.clear()
+            save_layout(courts, layout)
             add_audit_log(audit, "Reset Courts", "All courts cleared", "admin")
             st.success("✅ All courts reset!")
             st.rerun()
@@ -385,123 +260,12 @@ def render_court_layout_page(courts, audit):
     st.markdown("---")
     st.markdown("### 🏸 Step 3: Assign Courts to Grid Positions")
     
-    # Get current court assignments
-    court_grid = {}
-    for court in courts.get("courts", []):
-        if court.get("active", True):
-            pos = court.get("position", {})
-            row_pos, col_pos = pos.get("row", 0), pos.get("col", 0)
-            court_grid[(row_pos, col_pos)] = court
-    
     # Count assigned courts
-    assigned_courts = len(court_grid)
+    layout = CourtLayout.from_dict(courts)
+    assigned_courts = len(layout.placed(rows, cols))
     
-    # Display grid for court assignment
-    for row in range(rows):
-        st.markdown(f"**Row {row + 1}:**")
-        grid_cols = st.columns(cols)
-        
-        for col in range(cols):
-            with grid_cols[col]:
-                court_at_position = court_grid.get((row, col))
-                
-                if court_at_position:
-                    # Display existing court
-                    st.markdown(f"**Position ({row+1}, {col+1})**")
-                    st.success(f"✅ {court_at_position['name']}")
-                    st.write(f"**Level:** {court_at_position['level'].title()}")
-                    
-                    # Edit and Remove buttons
-                    edit_col, remove_col = st.columns(2)
-                    
-                    with edit_col:
-                        if st.button("✏️ Edit", key=f"edit_btn_{row}_{col}", use_container_width=True):
-                            st.session_state[f"editing_{row}_{col}"] = True
-                            st.rerun()
-                    
-                    with remove_col:
-                        if st.button("🗑️ Remove", key=f"remove_btn_{row}_{col}", use_container_width=True):
-                            # Remove court
-                            courts["courts"] = [c for c in courts["courts"] 
-                                              if not (c.get("position", {}).get("row") == row and 
-                                                     c.get("position", {}).get("col") == col)]
-                            add_audit_log(audit, "Removed Court", f"Court removed from ({row+1}, {col+1})", "admin")
-                            st.success(f"🗑️ Court removed from position ({row+1}, {col+1})")
-                            st.rerun()
-                
-                # Show form for editing or adding new court
-                if st.session_state.get(f"editing_{row}_{col}", False) or not court_at_position:
-                    st.markdown(f"**Position ({row+1}, {col+1})**")
-                    
-                    # Initialize form values
-                    if court_at_position:
-                        default_name = court_at_position['name']
-                        default_level = court_at_position['level']
-                    else:
-                        default_name = f"Court {assigned_courts + 1}"
-                        default_level = "beginner"
-                    
-                    # Create form
-                    with st.form(key=f"court_form_{row}_{col}"):
-                        court_name = st.text_input("Court Name", value=default_name)
-                        skill_level = st.selectbox("Skill Level", 
-                                                 ["beginner", "intermediate", "advanced"],
-                                                 index=["beginner", "intermediate", "advanced"].index(default_level))
-                        
-                        form_col1, form_col2 = st.columns(2)
-                        
-                        with form_col1:
-                            save_clicked = st.form_submit_button("💾 Save", use_container_width=True)
-                        
-                        with form_col2:
-                            cancel_clicked = st.form_submit_button("❌ Cancel", use_container_width=True)
-                        
-                        if save_clicked:
-                            if court_name.strip():
-                                # Check for duplicate names (excluding current court)
-                                existing_names = []
-                                for c in courts["courts"]:
-                                    if c.get("active", True):
-                                        c_pos = c.get("position", {})
-                                        if not (c_pos.get("row") == row and c_pos.get("col") == col):
-                                            existing_names.append(c.get("name", ""))
-                                
-                                if court_name in existing_names:
-                                    st.error(f"❌ Court name '{court_name}' already exists!")
-                                else:
-                                    # Remove existing court at this position
-                                    courts["courts"] = [c for c in courts["courts"] 
-                                                      if not (c.get("position", {}).get("row") == row and 
-                                                             c.get("position", {}).get("col") == col)]
-                                    
-                                    # Add new/updated court
-                                    new_id = max([c.get("id", 0) for c in courts["courts"]], default=0) + 1
-                                    courts["courts"].append({
-                                        "id": new_id,
-                                        "name": court_name,
-                                        "level": skill_level,
-                                        "position": {"row": row, "col": col},
-                                        "active": True
-                                    })
-                                    
-                                    action = "Updated" if court_at_position else "Added"
-                                    add_audit_log(audit, f"{action} Court", f"{court_name} ({skill_level}) at ({row+1}, {col+1})", "admin")
-                                    
-                                    # Clear edit mode
-                                    if f"editing_{row}_{col}" in st.session_state:
-                                        del st.session_state[f"editing_{row}_{col}"]
-                                    
-                                    st.success(f"✅ {court_name} saved successfully!")
-                                    st.rerun()
-                            else:
-                                st.error("❌ Please enter a court name!")
-                        
-                        if cancel_clicked:
-                            if f"editing_{row}_{col}" in st.session_state:
-                                del st.session_state[f"editing_{row}_{col}"]
-                            st.rerun()
-                
-                st.markdown("---")
+    # All positions are edited in one table and applied together
+    render_court_grid_editor(courts, audit, rows, cols)
     
     # Summary Section
     st.markdown("---")
@@ -531,27 +295,7 @@ def render_court_layout_page(courts, audit):
         quick_col1, quick_col2, quick_col3 = st.columns(3)
         
         with quick_col1:
-            if st.button("🎲 Auto-Fill Empty Positions", use_container_width=True):
-                filled = 0
-                for r in range(rows):
-                    for c in range(cols):
-                        if (r, c) not in court_grid and assigned_courts + filled < total_courts:
-                            filled += 1
-                            new_id = max([ct.get("id", 0) for ct in courts["courts"]], default=0) + 1
-                            courts["courts"].append({
-                                "id": new_id,
-                                "name": f"Court {assigned_courts + filled}",
-                                "level": ["beginner", "intermediate", "advanced"][(filled - 1) % 3],
-                                "position": {"row": r, "col": c},
-                                "active": True
-                            })
-                
-                if filled > 0:
-                    add_audit_log(audit, "Auto-filled Courts", f"{filled} courts auto-generated", "admin")
-                    st.success(f"✅ Auto-filled {filled} courts!")
-                    st.rerun()
-                else:
-                    st.info("ℹ️ No empty positions to fill!")
+            render_auto_fill(players, courts, audit, layout, rows, cols, total_courts)
         
         with quick_col2:
             if st.button("📋 Export Configuration", use_container_width=True):
@@ -568,7 +312,9 @@ def render_court_layout_page(courts, audit):
         with quick_col3:
             if st.button("✅ Finalize Layout", use_container_width=True):
                 if assigned_courts == total_courts:
+                    snapshot = save_layout_snapshot(courts)
                     st.success("🎉 Layout is complete and ready!")
+                    st.caption(f"Snapshot saved to {snapshot}; `python export_layouts.py` renders it with the current layout.")
                     add_audit_log(audit, "Layout Finalized", f"{total_courts} courts configured", "admin")
                 else:
                     st.warning(f"⚠️ {total_courts - assigned_courts} courts still need to be assigned!")
@@ -580,15 +326,41 @@ def render_court_layout_page(courts, audit):
         settings = courts.get("layout_settings", {})
         court_list = courts.get("courts", [])
         
-        preview_img = generate_court_image(court_list, settings)
-        st.image(preview_img, caption="Court Layout Preview", use_container_width=True)
+        # Edits are previewed at reduced size; the full-resolution render is only for export
+        preview_scale = st.select_slider("🔍 Preview Scale", options=[0.25, 0.5, 0.75, 1.0],
+                                         value=settings.get("preview_scale", DEFAULT_PREVIEW_SCALE))
+        backends = list(RENDER_BACKENDS)
+        render_backend = st.selectbox(
+            "🖌️ Renderer", backends,
+            index=backends.index(settings.get("render_backend", DEFAULT_RENDER_BACKEND)),
+            help="numpy paints all court shapes as array operations, tiles redraws only changed courts")
+        # Stored only when changed, so opening the designer never rewrites court_layout.json
+        if preview_scale != settings.get("preview_scale", DEFAULT_PREVIEW_SCALE):
+            settings["preview_scale"] = preview_scale
+        if render_backend != settings.get("render_backend", DEFAULT_RENDER_BACKEND):
+            settings["render_backend"] = render_backend
+        st.image(get_preview_bytes(court_list, settings), output_format="PNG",
+                 caption=f"Court Layout Preview ({preview_scale:.0%})", use_container_width=True)
+        hidden = hidden_courts(court_list, settings, preview_scale)
+        if hidden:
+            st.warning(f"⚠️ {hidden} courts don't fit on the preview and are not shown. "
+                       "Use a larger preview scale or image size, or fewer rows and columns.")
+        st.caption(f"Font: {font_source(20) or 'built-in bitmap'}")
         
         # Download button
-        img_buffer = io.BytesIO()
-        preview_img.save(img_buffer, format='PNG')
-        st.download_button("📥 Download Layout Image", data=img_buffer.getvalue(),
-                          file_name=f"court_layout_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png", 
-                          mime="image/png", use_container_width=True)
+        image_format = st.selectbox("Image Format", list(DOWNLOAD_FORMATS), format_func=lambda f: DOWNLOAD_FORMATS[f][0])
+        _, mime, extension = DOWNLOAD_FORMATS[image_format]
+        # Encoded only when the button is clicked, not on every rerun
+        st.download_button("📥 Download Layout Image", data=lazy_court_image_bytes(court_list, settings, image_format),
+                          file_name=f"court_layout_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}", 
+                          mime=mime, on_click="ignore", use_container_width=True)
+        
+        if st.button("📊 Compare Image Formats"):
+            st.dataframe(pd.DataFrame(benchmark_encodings(get_court_image(court_list, settings))), use_container_width=True)
+        
+        if st.button("⏱️ Benchmark Renderers"):
+            st.dataframe(pd.DataFrame(benchmark_backends(grids=((10, 10), (20, 20)), settings=settings, repeat=3)),
+                         use_container_width=True)
     except Exception as e:
         st.error(f"Error generating preview: {str(e)}")
 
@@ -610,10 +382,28 @@ def render_admin_panel(players, courts, audit):
     col2.metric("Total Waitlisted", total_waitlist)
     col3.metric("Total Courts", total_courts)
     
+    # Persistence statistics for this session
+    write_stats = st.session_state.data_store.stats
+    col1, col2, col3 = st.columns(3)
+    col1.metric("File Writes", write_stats["writes"])
+    col2.metric("Writes Avoided", write_stats["skipped"])
+    col3.metric("Cached Loads", JSON_CACHE_STATS["hits"])
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Layout Renders", RENDER_CACHE_STATS["misses"])
+    col2.metric("Cached Layout Views", RENDER_CACHE_STATS["hits"])
+    col3.metric("Cache Evictions", RENDER_CACHE_STATS["evictions"])
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Text Measurements", TEXT_METRICS_STATS["misses"])
+    col2.metric("Text Metrics Hit Rate", f"{hit_rate(TEXT_METRICS_STATS):.0%}")
+    col3.metric("Text Metrics Evictions", TEXT_METRICS_STATS["evictions"])
+    
     # Audit trail
     st.markdown("### Audit Trail")
-    if audit:
-        audit_df = pd.DataFrame(audit)
+    audit_entries = audit.entries()
+    if audit_entries:
+        audit_df = pd.DataFrame(audit_entries)
         st.dataframe(audit_df, use_container_width=True)
         
         # Export option
@@ -643,8 +433,15 @@ def main():
         try:
             settings = courts.get("layout_settings", {})
             court_list = courts.get("courts", [])
-            court_img = generate_court_image(court_list, settings)
-            st.image(court_img, caption="Current Court Layout", use_container_width=True)
+            if st.toggle("Vector view (SVG)", key="home_svg"):
+                st.image(get_court_svg(court_list, settings), caption="Current Court Layout", use_container_width=True)
+            else:
+                # Encoded once per layout version and sent as-is to every viewer
+                st.image(get_court_image_bytes(court_list, settings), output_format="PNG",
+                         caption="Current Court Layout", use_container_width=True)
+            hidden = hidden_courts(court_list, settings)
+            if hidden:
+                st.warning(f"⚠️ {hidden} courts don't fit on the layout image and are not shown.")
             
             # Quick stats
             active_courts = [c for c in court_list if c.get("active", True)]
@@ -660,10 +457,10 @@ def main():
         
         # Player management
         st.markdown("### 👥 Player Registration")
-        render_player_management(players, day, audit)
+        render_player_management(players, day, audit, courts)
     
     elif page == "Court Layout":
-        render_court_layout_page(courts, audit)
+        render_court_layout_page(players, courts, audit)
     
     elif page == "Admin Panel":
         render_admin_panel(players, courts, audit)